@@ -1,9 +1,18 @@
 import signal
+from gui.startup import STARTUP, preload_files
+from app.constants import CONST
+
+# Read the fonts, textures and sounds into the page cache while the
+# modules are imported
+ASSETS = CONST.GUI_DIR.joinpath('assets')
+preload_files(path for pattern in ('*.ttf', '*.atlas', '*.png', '*.wav')
+              for path in sorted(ASSETS.glob('**/' + pattern)))
+
 from kivy import Config
 Config.set('graphics', 'width', '1280')
 Config.set('graphics', 'height', '800')
 from gui.lcars import LCARSApp
-from app.constants import CONST
+STARTUP.mark('imports')
 
 from logging import FileHandler
 from logging.handlers import RotatingFileHandler
@@ -0,0 +1,204 @@
+import operator
+import time
+
+from app.constants import CONST
+
+
+class CompiledAlarm:
+    """An alarm definition reduced to what is needed to evaluate it"""
+    __slots__ = ('name', 'datapoint', 'test', 'limit', 'status',
+                 'description', 'since', 'active')
+
+    def __init__(self, name, datapoint, test, limit, status, description):
+        self.name = name
+        self.datapoint = datapoint
+        self.test = test
+        self.limit = limit
+        self.status = status
+        self.description = description
+        self.since = None  # Monotonic time the condition became true
+        self.active = False  # Result of the last evaluation
+
+
+class AlarmEngine:
+    """Evaluates the inactive alarms in memory.
+
+    Alarm definitions are compiled into predicates once and only reloaded
+    when the Alarms change version moves. Delays are timed in memory from
+    the monotonic time the condition became true, the database is only
+    written to by the caller when an alarm changes state.
+
+    Alarms are indexed by datapoint and each scan reads only the
+    datapoints that changed since the previous scan (from the DataLog
+    change feed). Only their alarms, and alarms with a running delay, are
+    evaluated. Everything is evaluated after a reload and every
+    CONST.ALARM_FULL_SCAN_TIME, which also picks up calibration changes.
+    """
+
+    OPERATORS = {'eq': operator.eq,
+                 'ne': operator.ne,
+                 'gt': operator.gt,
+                 'ge': operator.ge,
+                 'lt': operator.lt,
+                 'le': operator.le}
+
+    def __init__(self, alarm_db, data_db, log):
+        self._alarm_db = alarm_db
+        self._data_db = data_db
+        self.log = log
+        self.version = None
+        self.alarms = dict()
+        self.datapoints = tuple()
+        self.index = dict()  # {datapoint: [CompiledAlarm, ...]}
+        self.timing = set()  # Alarms with a running delay
+        self.change_id = None
+        self._full_scan_time = 0
+
+    def load(self):
+        """Recompiles the alarm definitions if they have changed.
+
+        Returns:
+            bool: True if the definitions were reloaded
+        """
+        version = self._alarm_db.alarm_version()
+        if version is not None and version == self.version:
+            return False
+
+        rows = self._alarm_db.get_inactive_alarms()
+        if rows is False:
+            return False
+        self.version = version
+
+        alarms = dict()
+        for row in rows or ():
+            alarm = self._compile(row)
+            if alarm is None:
+                continue
+            # Running delays survive a reload
+            previous = self.alarms.get(alarm.name)
+            if previous is not None:
+                alarm.since = previous.since
+            alarms[alarm.name] = alarm
+
+        index = dict()
+        for alarm in alarms.values():
+            index.setdefault(alarm.datapoint, list()).append(alarm)
+
+        self.alarms = alarms
+        self.index = index
+        self.datapoints = tuple(index)
+        self.timing = set()
+        self.change_id = None  # Forces a full evaluation
+        return True
+
+    def _compile(self, row):
+        name, datapoint, op, value, val_type, delay, status, desc = row
+
+        op_func = self.OPERATORS.get(op)
+        if op_func is None:
+            self.log.warning(f'Alarm {name} has an unknown operation ({op}).')
+            return None
+
+        if val_type == 'bool':
+            limit = value != '0'
+        elif val_type == 'float':
+            try:
+                limit = float(value)
+            except (TypeError, ValueError):
+                self.log.warning(f'Alarm {name} has an invalid value '
+                                 f'({value}).')
+                return None
+        else:
+            limit = value
+
+        def test(current, op_func=op_func, limit=limit):
+            return op_func(current, limit)
+
+        return CompiledAlarm(name, datapoint, test,
+                             self._delay_limit(delay), status, desc)
+
+    @staticmethod
+    def _delay_limit(delay):
+        try:
+            return float(delay)
+        except (TypeError, ValueError):
+            return 0.0
+
+    def scan(self):
+        """Evaluates the alarms whose inputs changed or whose delay is
+        running
+
+        Returns:
+            tuple: (alarms to activate, alarms to move to ACLR), both lists
+            of CompiledAlarm
+        """
+        activate = list()
+        cleared = list()
+        if not self.datapoints:
+            return activate, cleared
+
+        values = self._read_values()
+        if values is False:
+            return activate, cleared
+
+        now = time.monotonic()
+        candidates = set(self.timing)
+        for datapoint in values:
+            candidates.update(self.index.get(datapoint, ()))
+
+        for alarm in candidates:
+            if alarm.datapoint in values:
+                value = values[alarm.datapoint]
+                if value is None:
+                    continue
+                try:
+                    alarm.active = alarm.test(value)
+                except TypeError:
+                    continue
+
+            if alarm.active:
+                if alarm.status == 'ACK':
+                    continue
+                if alarm.since is None:
+                    alarm.since = now
+                if now - alarm.since >= alarm.limit:
+                    alarm.since = None
+                    self.timing.discard(alarm)
+                    activate.append(alarm)
+                else:
+                    self.timing.add(alarm)
+            else:
+                alarm.since = None
+                self.timing.discard(alarm)
+                if alarm.status == 'ACK':
+                    cleared.append(alarm)
+
+        return activate, cleared
+
+    def _read_values(self):
+        """Returns {datapoint: value} for the datapoints to evaluate"""
+        now = time.monotonic()
+        if self.change_id is None or now > self._full_scan_time:
+            # Take the feed position first so nothing is missed
+            change_id = self._data_db.data_change_id()
+            if change_id is False:
+                return False
+            values = self._data_db.data_read(self.datapoints)
+            if values is False:
+                return False
+            self.change_id = change_id
+            self._full_scan_time = now + CONST.ALARM_FULL_SCAN_TIME
+            return values or dict()
+
+        changes = self._data_db.data_changes(self.change_id)
+        if changes is False:
+            return False
+
+        change_id, values = changes
+        if change_id < self.change_id:
+            # The change log restarted, re-read everything next scan
+            self.change_id = None
+            return dict()
+
+        self.change_id = change_id
+        return values
@@ -1,9 +1,8 @@
 import time
-import smtplib
-import operator
-import threading
 from app.program import Program
 from app.database import AlarmDatabase
+from app.alarm_engine import AlarmEngine
+from app.notifier import AlarmNotifier
 
 
 class Alarm_Scan(Program):
@@ -15,7 +14,7 @@ class Alarm_Scan(Program):
     SILENT = 'SIL'
     ACKNOWLEDGE = 'ACK'
     CLEAR = 'CLR'
-
+    SETTINGS_REFRESH = 5  # Seconds between re-reading the settings
 
     def program_init(self):
         self.alarm_db = AlarmDatabase()
@@ -26,6 +25,13 @@ class Alarm_Scan(Program):
         self.call_stop_every_cycle = False
         self.reload_config_on_restart = True
         self._first_run = True
+        self.engine = AlarmEngine(self.alarm_db, self._database, self.log)
+        self.notifier = AlarmNotifier(self.log)
+        self._output = None
+        self._output_state = None
+        self._output_version = None
+        self._send_messages = False
+        self._settings_time = 0
 
         self.write_datapoint('Failed_Process', False)
         self.write_datapoint('Stalled_Process', False)
@@ -35,7 +41,7 @@ class Alarm_Scan(Program):
                                   datapoint='Failed_Process',
                                   operation='eq',
                                   value=True,
-                                  delay='0:0',
+                                  delay=0,
                                   priority='1',
                                   enabled=True,
                                   status='CLR')
@@ -45,15 +51,19 @@ class Alarm_Scan(Program):
                                   datapoint='Stalled_Process',
                                   operation='eq',
                                   value=True,
-                                  delay='0:0',
+                                  delay=0,
                                   priority='1',
                                   enabled=True,
                                   status='CLR')
 
-        if self.config is None:
-            return
-        else:
+        if self.config is not None:
             self._parse_config()
+
+        # Start once the programs providing the alarm datapoints are ready
+        alarms = self.alarm_db.read_alarm(parameters=('Datapoint', 'Value'))
+        self.requires = sorted({alarm['Datapoint']
+                                for alarm in (alarms or dict()).values()
+                                if alarm['Datapoint']})
     
     def _parse_config(self):
         if not self.config.has_section('BASIC'):
@@ -84,10 +94,9 @@ class Alarm_Scan(Program):
                 except ValueError:
                     val = att_list[3]
                 try:
-                    delay = int(att_list[4])
-                    delay = str(delay) + ':0'
+                    delay = float(att_list[4])
                 except ValueError:
-                    delay = '0:0'
+                    delay = 0
                 self.alarm_db.write_alarm(alarm_name=key,
                                             description=att_list[1],
                                             datapoint=att_list[0],
@@ -98,130 +107,82 @@ class Alarm_Scan(Program):
                                             enabled=True,
                                             status='CLR')
         
-    def _check_delay(self, delay):
-        limit, value = delay.split(':')
-        value = float(value)
-        if value != 0:
-            return limit + ':0.0'
-        else:
-            return False
-
-    def _increment_delay(self, delcnt, amount):
-        limit, value = delcnt.split(':')
-        limit = float(limit)
-        value = float(value) + amount
-        if value >= limit:
-            value = 0
-            return (str(limit) + ':' + str(value), True)
-        else:
-            return (str(limit) + ':' + str(value), False)
-
-    def _manage_state(self, alarm, delta):
-        n_delay, roll = self._increment_delay(alarm[5], delta)
-        self.alarm_db.write_alarm(alarm[0], delay=n_delay)
-        if roll:
-            return True
-        else:
-            return False
-
-    def _send_message(self, message, server, port, username, passwd, receiver):
-        content = "\n\n".join(message)
-        try:
-            with smtplib.SMTP_SSL(server, port) as server:
-                server.login(username, passwd)
-                server.sendmail(username, receiver, content)
-        except Exception as e:
-            return
-            
     def program_start(self):
-        # this sleep allows the rest of the programs to establish their
-        # datapoints before the alarm scanner starts running.
+        # LogicPi only starts the alarm scanner once the programs providing
+        # its datapoints are ready, see Program.requires
         if self._first_run:
-            time.sleep(5)
             self._first_run = False
         else:
             self._parse_config()
             self.settings_to_db(overwrite=True)
 
     def program_run(self):
-        message_list = []
-        alarms = self.alarm_db.get_inactive_alarms()
-        if alarms is None:
-            return
+        self._refresh_settings()
+        self.engine.load()
+        activate, cleared = self.engine.scan()
 
         a_list = list()
-        for alarm in alarms:
-            if alarm[4] == 'bool':
-                if alarm[3] == '0':
-                    avalue = False
-                else:
-                    avalue = True
-            elif alarm[4] == 'float':
-                avalue = float(alarm[3])
-            else:
-                avalue = alarm[3]
-
-            datapoint = self.read_datapoint(alarm[1])
-            if datapoint is None:
-                continue
-            elif getattr(operator, alarm[2])(datapoint, avalue):
-                if alarm[6] == 'ACK':
-                    continue
-                elif self._manage_state(alarm, self.period):
-                    a_list.append(alarm[0])
-                    if alarm[0] == 'Failed_Process' or alarm[0] == 'Stalled_Process':
-                        self.write_datapoint(alarm[0], False)
-                    message_list.append(f'***** ALARM ACTIVE *****\n'
-                                        f'Name: {alarm[0]}\n'
-                                        f'Desc: "{alarm[7]}"')
-            else:
-                wflag = False
-                t_state = None
-                t_delay = None
-                n_delay = self._check_delay(alarm[5])
-                if alarm[6] == 'ACK':
-                    t_state = 'ACLR'
-                    wflag = True
-                if n_delay:
-                    t_delay = n_delay
-                    wflag = True
-                if wflag:
-                    self.alarm_db.write_alarm(alarm[0],
-                                              delay=t_delay,
-                                              status=t_state)
-                    if t_state == 'ACLR':
-                        message_list.append(f'***** ALARM CLEAR *****\n'
-                                            f'Name: {alarm[0]}\n'
-                                            f'Desc: "{alarm[7]}"')
-
-        if message_list and self.read_setting('send_messages'):
-            server = str(self.read_setting('smtp_server'))
-            port = int(self.read_setting('smtp_port'))
-            login = str(self.read_setting('smtp_username'))
-            passwd = str(self.read_setting('smtp_password'))
-            receiver = str(self.read_setting('msg_receiver'))
-
-            t1 = threading.Thread(target=self._send_message, 
-                                  kwargs={'message': message_list,
-                                          'server': server,
-                                          'port': port,
-                                          'username': login,
-                                          'passwd': passwd,
-                                          'receiver': receiver})
-            t1.start()  
-            # I don't join the thread as I don't want this thread to wait
+        for alarm in activate:
+            a_list.append(alarm.name)
+            if alarm.name in ('Failed_Process', 'Stalled_Process'):
+                self.write_datapoint(alarm.name, False)
+            if self._send_messages:
+                self.notifier.notify(alarm.name, 'ACTIVE', alarm.description)
+
+        for alarm in cleared:
+            if self.alarm_db.write_alarm(alarm.name, status='ACLR'):
+                alarm.status = 'ACLR'
+                if self._send_messages:
+                    self.notifier.notify(alarm.name, 'CLEAR',
+                                         alarm.description)
 
         if a_list:
             self.alarm_db.activate_alarms(tuple(a_list))
 
-        output = self.read_setting('local_output')
-        if output is None:
+        self._update_output(bool(a_list or cleared))
+
+    def _refresh_settings(self):
+        """Re-reads the output and messaging settings in one query"""
+        if time.monotonic() < self._settings_time:
+            return
+        self._settings_time = time.monotonic() + self.SETTINGS_REFRESH
+        settings = self.read_settings()
+
+        output = settings.get('local_output')
+        if output != self._output:
+            self._output = output
+            self._output_state = None
+
+        self._send_messages = bool(settings.get('send_messages'))
+        if self._send_messages:
+            try:
+                self.notifier.configure(
+                    server=settings.get('smtp_server'),
+                    port=settings.get('smtp_port'),
+                    username=settings.get('smtp_username'),
+                    password=settings.get('smtp_password'),
+                    receiver=settings.get('msg_receiver'),
+                    use_ssl=settings.get('smtp_ssl', True))
+            except (TypeError, ValueError):
+                self.log.warning('Invalid messaging settings, alarm '
+                                 'notifications are disabled.')
+                self._send_messages = False
+
+    def _update_output(self, changed):
+        """Drives the local notification output, the alarm state is only
+        queried when the alarms have changed.
+        """
+        if self._output is None:
             return
 
-        if self.alarm_db.is_act_alarm() > 0:
-            self.write_datapoint(output, True)
-        else:
-            self.write_datapoint(output, False)
+        if changed or self._output_state is None \
+                or self.engine.version != self._output_version:
+            self._output_version = self.engine.version
+            state = self.alarm_db.is_act_alarm() > 0
+            if state != self._output_state:
+                if self.write_datapoint(self._output, state):
+                    self._output_state = state
 
     def program_halt(self):
+        self.notifier.stop()
         self.alarm_db.close_connection()
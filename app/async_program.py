@@ -0,0 +1,88 @@
+import asyncio
+import functools
+import inspect
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from app.constants import CONST
+from app.program import Program
+
+
+class AsyncProgram(Program):
+    """Base class for programs with async hooks.
+
+    program_start, program_run, program_pause, program_stop, program_fail
+    and program_halt may be declared with async def, program_init is
+    always synchronous. Each call runs to completion on the program's event
+    loop within the cycle, so the state machine, periods and supervision
+    are the same as for Program, but IO waits inside a cycle can overlap.
+    For example:
+
+        async def program_run(self):
+            values = await asyncio.gather(
+                *(self.run_blocking(read, sensor) for sensor in sensors))
+
+    Blocking calls, sysfs, I2C or SMTP, are offloaded with run_blocking()
+    to a pool of CONST.ASYNC_IO_THREADS threads, the *_async database
+    methods do the same for datapoint reads and writes.
+    """
+    _loop = None
+    _executor = None
+
+    def operate_start(self):
+        self._loop = asyncio.new_event_loop()
+        self._executor = ThreadPoolExecutor(
+            max_workers=CONST.ASYNC_IO_THREADS,
+            thread_name_prefix=self.name)
+        super().operate_start()
+
+    def operate_end(self):
+        super().operate_end()
+        self._close_thread_connections()
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        self._loop.close()
+        self._loop = None
+
+    def _close_thread_connections(self):
+        """Closes the database connection of each IO thread. Every task
+        waits at the barrier, so each one runs in a different thread.
+        """
+        barrier = threading.Barrier(CONST.ASYNC_IO_THREADS)
+
+        def close():
+            self._database.close_thread_connection()
+            try:
+                barrier.wait(CONST.ASYNC_CLOSE_TIMEOUT)
+            except threading.BrokenBarrierError:
+                pass
+
+        for _ in range(CONST.ASYNC_IO_THREADS):
+            self._executor.submit(close)
+
+    def _call(self, hook):
+        result = hook()
+        if not inspect.isawaitable(result):
+            return result
+        if self._loop is None:
+            # Outside operate(), e.g. program_fail during program_init
+            return asyncio.run(result)
+        return self._loop.run_until_complete(result)
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """Runs a blocking function in the IO thread pool and returns its
+        result.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs))
+
+    async def read_datapoint_async(self, datapoint):
+        return await self.run_blocking(self.read_datapoint, datapoint)
+
+    async def read_datapoints_async(self, datapoints):
+        return await self.run_blocking(self.read_datapoints, datapoints)
+
+    async def write_datapoint_async(self, datapoint, value):
+        return await self.run_blocking(self.write_datapoint, datapoint,
+                                       value)
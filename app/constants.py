@@ -34,15 +34,157 @@ class CONST:
                                    '%(message)s',
                                    '%Y-%m-%d %H:%M:%S')
 
+    # Database Tuning
+    # Prepared statements kept per connection, sized for the full query set
+    DB_STATEMENT_CACHE = 128
+    # Pragmas applied to every new connection, in order
+    DB_PRAGMAS = {
+        # Only takes effect on a new database, it must precede journal_mode
+        'auto_vacuum': 'INCREMENTAL',
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -4000,  # Negative values are KiB, 4MB page cache
+        'mmap_size': 16777216,  # 16MB memory mapped I/O
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,  # Milliseconds to wait on a locked database
+        # Pages, the SQLite default. DBMaintenance checkpoints the WAL from
+        # the LogicPi supervisor loop, usually before this is reached, this
+        # is the backstop when LogicPi is not running, e.g. GUI or tools.
+        'wal_autocheckpoint': 1000,
+        }
+    # Writes that fail with 'database is locked' are retried this many
+    # times, the delay between attempts doubles up to the maximum (seconds)
+    DB_WRITE_RETRIES = 4
+    DB_RETRY_DELAY = 0.05
+    DB_RETRY_MAX_DELAY = 1.0
+    # Seconds a write attempt may take before the time is counted as
+    # waiting on a lock, it may have been blocked in busy_timeout
+    DB_LOCK_WAIT_MIN = 0.05
+    # Seconds between each program logging its time spent on database locks
+    DB_LOCK_REPORT_TIME = 300
+    # Route program datapoint writes through a single writer process which
+    # commits everything received within one tick (seconds) together
+    DB_WRITER = False
+    DB_WRITER_TICK = 0.25
+    # Run 'PRAGMA optimize' when a connection is closed
+    DB_OPTIMIZE_ON_CLOSE = True
+
+    # Database Maintenance (run by LogicPi)
+    # Seconds between PASSIVE WAL checkpoints
+    DB_CHECKPOINT_TIME = 30
+    # A TRUNCATE checkpoint is used once the WAL grows beyond this (bytes)
+    DB_WAL_TRUNCATE_SIZE = 4194304  # 4MB
+    # Checkpoints taking longer than this (seconds) are logged as warnings
+    DB_CHECKPOINT_WARN = 0.5
+    # Seconds between retention pruning / incremental vacuum
+    DB_PRUNE_TIME = 3600
+    # Datalog table is limited to 14 days of data
+    DATALOG_DAYS = 14
+    # SystemLog table is limited by age and by row count
+    SYSLOG_DAYS = 30
+    SYSLOG_MAX_ROWS = 50000
+    # Rows deleted per transaction while pruning
+    DB_PRUNE_BATCH = 5000
+    # Seconds between ANALYZE / PRAGMA optimize runs
+    DB_OPTIMIZE_TIME = 86400
+    # Convert existing databases to incremental auto vacuum on start, this
+    # requires a one off full VACUUM
+    DB_AUTO_VACUUM = True
+
+    # Alarms
+    # Seconds between evaluating every alarm, between these only alarms
+    # whose datapoint changed (or whose delay is running) are evaluated
+    ALARM_FULL_SCAN_TIME = 10
+
+    # Alarm notifications
+    # Alarm events held for sending, further events are counted and dropped
+    NOTIFY_QUEUE_SIZE = 500
+    # Seconds to collect alarm events into one message
+    NOTIFY_WINDOW = 30
+    # Maximum messages sent per hour, further events wait for the next slot
+    NOTIFY_MAX_PER_HOUR = 12
+    # Seconds without events before the SMTP connection is closed
+    NOTIFY_IDLE_TIMEOUT = 300
+    # SMTP socket timeout in seconds
+    NOTIFY_SMTP_TIMEOUT = 20
+
     # Misc
     # How many stalled process cycles before triggering alarm
     PROCESS_STALL_CYCLES = 10
     # How many seconds between process checks
     PROCESS_CHECK_TIME = 5
-    # How many seconds to allow processes to start running
+    # How many seconds a program is given to complete its first cycle
+    # before it is checked for stalls
     PROCESS_CHECK_DELAY = 5
+    # Seconds a program waits at startup for the programs providing its
+    # required datapoints to be ready before it is started anyway
+    READY_TIMEOUT = 30
+    # Seconds between readiness checks while programs are starting
+    READY_POLL_TIME = 0.05
+    # Seconds between checks of the Settings version for a change to the
+    # LogicPi Enabled setting, process exits and SIGTERM are handled
+    # immediately
+    PROCESS_ENABLED_TIME = 1
+    # Seconds the programs are given to halt at shutdown, they are halted
+    # together so this is the total, not per program
+    PROCESS_HALT_TIME = 5
+    # Seconds between logs of each program's memory use
+    PROCESS_MEMORY_TIME = 3600
+    # Seconds between logs of each program's cycle lateness (jitter)
+    PROCESS_LATENESS_TIME = 600
+    # Seconds between checks for a halted member of a program group
+    # leaving HALT
+    GROUP_HALT_CHECK_TIME = 1
+    # Threads per AsyncProgram for blocking IO, see app.async_program
+    ASYNC_IO_THREADS = 8
+    # Seconds each IO thread waits for the others while their database
+    # connections are closed at the end of operate()
+    ASYNC_CLOSE_TIMEOUT = 5
+    # Seconds between scans and between scan time reports, see
+    # app.scan_cycle
+    SCAN_PERIOD = 0.25
+    SCAN_REPORT_TIME = 60
+    # Seconds a scan's outputs queued to the database writer are kept over
+    # the latched values while the writer has not committed them
+    SCAN_PENDING_TIME = 2
+    # Seconds between Last_Run writes, stalls are detected from the shared
+    # memory heartbeats
+    LAST_RUN_PERSIST_TIME = 10
 
-    # Datalog table is limited to 14 days of data
+    # Load shedding, see app.governor
+    # Seconds between governor updates
+    GOVERNOR_TIME = 5
+    # CPU load fractions to raise and lower the load level at
+    GOVERNOR_CPU_HIGH = 0.85
+    GOVERNOR_CPU_LOW = 0.6
+    # Period multipliers by criticality for each load level, from level 1
+    GOVERNOR_LEVELS = ({'LOW': 2},
+                       {'LOW': 4},
+                       {'LOW': 4, 'NORMAL': 2},
+                       {'LOW': 8, 'NORMAL': 4})
+    # A LOW or NORMAL program that overruns its period has its own period
+    # doubled, up to this multiplier, and halved again after this many
+    # governor updates without an overrun
+    GOVERNOR_OVERRUN_MAX = 4
+    GOVERNOR_OVERRUN_RELAX = 12
+
+    # Statements are re-run by LogicPi on every start, they must be safe
+    # to apply to an existing database.
+    # Also used by BasicDatabase.migrate_alarms() to rebuild older tables
+    DB_ALARMS_TABLE = """CREATE TABLE IF NOT EXISTS Alarms (
+            id INTEGER PRIMARY KEY,
+            Name TEXT NOT NULL UNIQUE,
+            Description TEXT,
+            Enabled TEXT,
+            LastEvent REAL,
+            Status TEXT,
+            Datapoint TEXT,
+            Operation TEXT,
+            Value TEXT,
+            ValType TEXT,
+            Delay REAL,
+            Priority INTEGER)
+        """
     DB_CREATE_STRS = (
         """CREATE TABLE IF NOT EXISTS Data (
             id INTEGER PRIMARY KEY,
@@ -79,13 +221,11 @@ class CONST:
                         new.Value);
             END
         """,
-        """CREATE TRIGGER IF NOT EXISTS DataLog_Timelimit
-            AFTER INSERT ON DataLog
-            BEGIN
-                DELETE FROM DataLog
-                WHERE
-                Timestamp < ((julianday('now') - 2440601.5)*86400.0);
-            END
+        # Retention is handled by the LogicPi maintenance job, the old
+        # per-insert trigger scanned the whole table on every data change
+        """DROP TRIGGER IF EXISTS DataLog_Timelimit""",
+        """CREATE INDEX IF NOT EXISTS DataLog_Timestamp
+            ON DataLog(Timestamp)
         """,
         """CREATE TABLE IF NOT EXISTS Programs (
             id INTEGER PRIMARY KEY,
@@ -117,20 +257,16 @@ class CONST:
             Function TEXT,
             Line INTEGER)
         """,
-        """CREATE TABLE IF NOT EXISTS Alarms (
-            id INTEGER PRIMARY KEY,
-            Name TEXT NOT NULL UNIQUE,
-            Description TEXT,
-            Enabled TEXT,
-            LastEvent REAL,
-            Status TEXT,
-            Datapoint TEXT,
-            Operation TEXT,
-            Value TEXT,
-            ValType TEXT,
-            Delay TEXT,
-            Priority INTEGER)
+        """CREATE INDEX IF NOT EXISTS SystemLog_Timestamp
+            ON SystemLog(Timestamp)
         """,
+        """CREATE INDEX IF NOT EXISTS SystemLog_Name
+            ON SystemLog(Name, id)
+        """,
+        """CREATE INDEX IF NOT EXISTS SystemLog_Level
+            ON SystemLog(Level, id)
+        """,
+        DB_ALARMS_TABLE,
         """CREATE TABLE IF NOT EXISTS AlarmsLog (
             id INTEGER PRIMARY KEY,
             Alarm_ID INTEGER NOT NULL REFERENCES Alarmss(id),
@@ -156,5 +292,70 @@ class CONST:
                 VALUES (new.id,
                         new.Status);
             END
+        """,
+        """CREATE INDEX IF NOT EXISTS AlarmsLog_Timestamp
+            ON AlarmsLog(Timestamp)
+        """,
+        # Change counters, readers compare a single integer to find out if
+        # a table has changed since they last looked
+        """CREATE TABLE IF NOT EXISTS Versions (
+            Name TEXT PRIMARY KEY,
+            Version INTEGER NOT NULL DEFAULT 0)
+        """,
+        """INSERT OR IGNORE INTO Versions(Name) VALUES ('Alarms')""",
+        """CREATE TRIGGER IF NOT EXISTS Alarms_version_insert
+            AFTER INSERT ON Alarms
+            BEGIN
+                UPDATE Versions SET Version = Version + 1
+                WHERE Name = 'Alarms';
+            END
+        """,
+        """CREATE TRIGGER IF NOT EXISTS Alarms_version_update
+            AFTER UPDATE ON Alarms
+            WHEN old.Name IS NOT new.Name
+                OR old.Description IS NOT new.Description
+                OR old.Enabled IS NOT new.Enabled
+                OR old.LastEvent IS NOT new.LastEvent
+                OR old.Status IS NOT new.Status
+                OR old.Datapoint IS NOT new.Datapoint
+                OR old.Operation IS NOT new.Operation
+                OR old.Value IS NOT new.Value
+                OR old.ValType IS NOT new.ValType
+                OR old.Delay IS NOT new.Delay
+                OR old.Priority IS NOT new.Priority
+            BEGIN
+                UPDATE Versions SET Version = Version + 1
+                WHERE Name = 'Alarms';
+            END
+        """,
+        """CREATE TRIGGER IF NOT EXISTS Alarms_version_delete
+            AFTER DELETE ON Alarms
+            BEGIN
+                UPDATE Versions SET Version = Version + 1
+                WHERE Name = 'Alarms';
+            END
+        """,
+        """INSERT OR IGNORE INTO Versions(Name) VALUES ('Settings')""",
+        """CREATE TRIGGER IF NOT EXISTS Settings_version_insert
+            AFTER INSERT ON Settings
+            BEGIN
+                UPDATE Versions SET Version = Version + 1
+                WHERE Name = 'Settings';
+            END
+        """,
+        """CREATE TRIGGER IF NOT EXISTS Settings_version_update
+            AFTER UPDATE ON Settings
+            WHEN old.Value IS NOT new.Value
+            BEGIN
+                UPDATE Versions SET Version = Version + 1
+                WHERE Name = 'Settings';
+            END
+        """,
+        """CREATE TRIGGER IF NOT EXISTS Settings_version_delete
+            AFTER DELETE ON Settings
+            BEGIN
+                UPDATE Versions SET Version = Version + 1
+                WHERE Name = 'Settings';
+            END
         """
     )
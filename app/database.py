@@ -5,13 +5,32 @@
 # and identifiers (such as table and column names), when quoted,
 # must use "double quotes".
 
+import os
 import time
+import threading
+import weakref
 
 import sqlite3
 from app.constants import CONST
 from app.syslog import get_local_log
 
 
+# Every database instance, so their connections can be dropped in a child
+# process after a fork.
+_instances = weakref.WeakSet()
+# Connections inherited from the parent. They are kept referenced and never
+# closed, sqlite3 connections must not be used or closed across a fork.
+_inherited_connections = list()
+
+
+def _after_fork_in_child():
+    for database in list(_instances):
+        database._drop_inherited_connections()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
 class OP_MODE:
     RUN = 'RUN'
     PAUSE = 'PAUSE'
@@ -32,37 +51,141 @@ class TYPES:
     BOOL = 'bool'
 
 
+def format_time(timestamp):
+    """Formats a unix timestamp for display, with milliseconds"""
+    return (time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+            + '.%03d' % int((timestamp % 1) * 1000))
+
+
 class BasicDatabase:
     """Don't use this class directly, it is intended to be used by the
     classes below.
+
+    Each thread using an instance gets its own connection, so an instance
+    can be shared between the Kivy main loop and worker threads without
+    two threads using one connection.
     """
     OP_MODES = [OP_MODE.RUN, OP_MODE.PAUSE, OP_MODE.STOP, OP_MODE.HALT]
     OP_STATES = [OP_STATE.RUN, OP_STATE.PAUSE, OP_STATE.STOP, OP_STATE.FAIL]
     TYPES = [TYPES.STR, TYPES.FLOAT, TYPES.BOOL]
 
-    def __init__(self, location=CONST.DB_FOLDER):
+    def __init__(self, location=CONST.DB_FOLDER, write_queue=None):
         self._log = get_local_log('Database')
         self._dbfile = location.joinpath(CONST.DB_FILE)
-        self.connection = None
+        self._local = threading.local()
+        self._connections = list()
+        self._conn_lock = threading.Lock()
+        self._lock_waits = dict()
+        _instances.add(self)
         if not self._dbfile.exists():
             self._log.info(f'Creating new database with sqlite version: '
                            f'{sqlite3.sqlite_version}')
-            for statement in CONST.DB_CREATE_STRS:
-                self.sql_write(statement)
+            self.create_tables()
+        # Set after creation, the schema must exist before anything is queued
+        self._write_queue = write_queue
+
+    def create_tables(self):
+        """Applies CONST.DB_CREATE_STRS, every statement is idempotent so
+        this also brings an existing database up to the current schema.
+        """
+        self.migrate_alarms()
+        for statement in CONST.DB_CREATE_STRS:
+            self.sql_write(statement, caller='create_tables')
+
+    def migrate_alarms(self):
+        """Rebuilds an Alarms table created before Delay was REAL. The
+        column affinity can only be changed by copying into a new table,
+        old '<limit>:<count>' delays keep only the limit.
+
+        Returns:
+            bool: True - Table rebuilt
+        """
+        connection = self._get_connection()
+        columns = {row[1]: row[2] for row in
+                   connection.execute('PRAGMA table_info(Alarms)')}
+        if not columns or columns.get('Delay') == 'REAL':
+            return False
+
+        delay = ("""CAST(CASE WHEN instr(Delay, ':') > 0
+                        THEN substr(Delay, 1, instr(Delay, ':') - 1)
+                        ELSE Delay
+                    END AS REAL)""")
+        names = ', '.join(columns)
+        values = ', '.join(delay if name == 'Delay' else name
+                           for name in columns)
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            # The old triggers go with the renamed table, create_tables()
+            # adds them back once the data is copied
+            connection.execute('ALTER TABLE Alarms RENAME TO Alarms_old')
+            connection.execute(CONST.DB_ALARMS_TABLE)
+            connection.execute(f'INSERT INTO Alarms ({names}) '
+                               f'SELECT {values} FROM Alarms_old')
+            connection.execute('DROP TABLE Alarms_old')
+            connection.execute('COMMIT')
+        except sqlite3.Error as e:
+            if connection.in_transaction:
+                connection.rollback()
+            self._log.error(f'Could not rebuild the Alarms table. {e}')
+            return False
+
+        self._log.info('Alarms table rebuilt with a numeric Delay column.')
+        return True
+
+    @property
+    def connection(self):
+        """The connection belonging to the calling thread, or None"""
+        return getattr(self._local, 'connection', None)
 
     def _get_connection(self):
-        """Create and return a simple connection"""
+        """Create and return the calling thread's connection"""
+        connection = self.connection
+        if connection is not None:
+            return connection
+
         try:
-            if not (self.connection):
-                self.connection = sqlite3.connect(str(self._dbfile))
-                self.connection.execute('PRAGMA JOURNAL_MODE=WAL')
-                self.connection.execute('PRAGMA SYNCHRONOUS=NORMAL')
+            connection = sqlite3.connect(
+                str(self._dbfile),
+                cached_statements=CONST.DB_STATEMENT_CACHE)
+            for pragma, value in CONST.DB_PRAGMAS.items():
+                connection.execute(f'PRAGMA {pragma}={value}')
 
         except Exception as e:
             self._log.error(f'Could not establish database connection. {e}')
             raise
 
-        return self.connection
+        self._local.connection = connection
+        with self._conn_lock:
+            self._connections.append(connection)
+        return connection
+
+    @property
+    def queued_writes(self):
+        """True if sql_write(queue=True) hands writes to the database
+        writer.
+        """
+        return self._write_queue is not None
+
+    def set_write_queue(self, write_queue):
+        """Replaces the database writer's queue, see sql_write()"""
+        self._write_queue = write_queue
+
+    def _drop_inherited_connections(self):
+        """Called in a forked child, the next query opens a new connection"""
+        _inherited_connections.extend(self._connections)
+        self._connections = list()
+        self._conn_lock = threading.Lock()
+        self._local = threading.local()
+
+    def in_list_sql(self, sql, count):
+        """Returns sql with an IN list of count placeholders appended
+
+        Args:
+            sql (str): SQL ending just before the placeholder list,
+            for example "SELECT * FROM Data WHERE Datapoint IN "
+            count (int): Number of placeholders required
+        """
+        return sql + '(' + ','.join('?' * count) + ')'
 
     def typecast(self, value, type):
         """will cast the value to the type requested. Returns the cast value,
@@ -91,36 +214,145 @@ class BasicDatabase:
             d_type = 'float'
         return d_type
 
-    def sql_write(self, sql, data=None):
+    def sql_write(self, sql, data=None, queue=False, caller='sql_write'):
         """Multiple row write function with error handling
 
         Args:
             sql (str): SQL scentence to be executed
             data (list of tuple, optional): Supporting data for SQL scentence.
             Defaults to None.
+            queue (bool, optional): Hand the write to the database writer
+            process if this instance was given a write queue. The write is
+            committed on the writer's next tick, so the affected row count is
+            not known and 1 is returned. Defaults to False.
+            caller (str, optional): Name the time spent waiting on locks is
+            recorded against, see lock_wait_stats().
+
+        Locked / busy errors are retried with a bounded exponential
+        backoff. Failed attempts, the backoff and attempts that took longer
+        than CONST.DB_LOCK_WAIT_MIN, blocked in busy_timeout, count as time
+        spent waiting.
 
         Returns:
             Number of affected rows, False if error
         """
+        if queue and self._write_queue is not None:
+            self._write_queue.put((sql, data))
+            return 1
+
+        return self._write(((sql, data),), caller)
+
+    def sql_write_batch(self, statements, caller='sql_write_batch'):
+        """Writes several statements in a single transaction (group commit).
+        If the transaction fails each statement is retried on its own so
+        one bad statement does not discard the rest of the batch.
+
+        Args:
+            statements (list of tuple): [(sql, data), ...] as per sql_write
+            caller (str, optional): As per sql_write
+
+        Returns:
+            int: Number of statements that could not be written
+        """
+        if not statements:
+            return 0
+
+        if self._write(statements, caller, log_errors=False) is not False:
+            return 0
+
+        failed = 0
+        for statement in statements:
+            if self._write((statement,), caller) is False:
+                failed += 1
+        return failed
+
+    def _write(self, statements, caller, log_errors=True):
         connection = self._get_connection()
-        cursor = connection.cursor()
+        delay = CONST.DB_RETRY_DELAY
+        waited = 0.0
+        attempt = 0
+
+        while True:
+            cursor = connection.cursor()
+            t_start = time.monotonic()
+            rowcount = 0
+            try:
+                for sql, data in statements:
+                    if data is None:
+                        cursor.execute(sql)
+                    else:
+                        cursor.executemany(sql, data)
+                    rowcount += cursor.rowcount
+                connection.commit()
+                elapsed = time.monotonic() - t_start
+                if elapsed > CONST.DB_LOCK_WAIT_MIN:
+                    waited += elapsed
+                break
+
+            except sqlite3.OperationalError as e:
+                connection.rollback()
+                if (not self._is_lock_error(e)
+                        or attempt >= CONST.DB_WRITE_RETRIES):
+                    if log_errors:
+                        self._log.error(f'Database error, sql: {sql} '
+                                        f'data: {data}. {e}')
+                    if self._is_lock_error(e):
+                        waited += time.monotonic() - t_start
+                        self._record_lock_wait(caller, waited, False)
+                    return False
 
-        try:
-            if data is None:
-                cursor.execute(sql)
-            else:
-                cursor.executemany(sql, data)
-            connection.commit()
+                time.sleep(delay)
+                waited += time.monotonic() - t_start
+                delay = min(delay * 2, CONST.DB_RETRY_MAX_DELAY)
+                attempt += 1
 
-        except sqlite3.Error as e:
-            self._log.error(f'Database error, sql: {sql} data: {data}. {e}')
-            connection.rollback()
-            return False
+            except sqlite3.Error as e:
+                if log_errors:
+                    self._log.error(f'Database error, sql: {sql} '
+                                    f'data: {data}. {e}')
+                connection.rollback()
+                return False
 
-        finally:
-            cursor.close()
+            finally:
+                cursor.close()
+
+        if waited:
+            self._record_lock_wait(caller, waited, True)
+            self._log.debug(f'Write delayed {waited:.3f}s by database lock '
+                            f'after {attempt} retries.')
+
+        return rowcount
 
-        return cursor.rowcount
+    @staticmethod
+    def _is_lock_error(error):
+        message = str(error)
+        return 'locked' in message or 'busy' in message
+
+    def _record_lock_wait(self, caller, waited, written):
+        stats = self._lock_waits.setdefault(caller, [0, 0.0, 0])
+        stats[0] += 1
+        stats[1] += waited
+        if not written:
+            stats[2] += 1
+
+    def lock_wait_stats(self, reset=False):
+        """Returns the time this instance has spent waiting on database locks
+
+        Args:
+            reset (bool, optional): Clear the statistics after reading them.
+            Defaults to False.
+
+        Returns:
+            dict: {caller: {'count': delayed writes,
+                            'wait': total seconds waited,
+                            'lost': writes that failed after retrying}}
+        """
+        r_dict = dict()
+        for caller, (count, wait, lost) in self._lock_waits.items():
+            r_dict[caller] = {'count': count, 'wait': wait, 'lost': lost}
+        if reset:
+            self._lock_waits = dict()
+        return r_dict
 
     def sql_read(self, sql, data=None):
         """Basic sql read function with error handling
@@ -157,17 +389,177 @@ class BasicDatabase:
             return None
         return rows
 
+# ************ Maintenance Functions ************
+
+    def wal_size(self):
+        """Returns the size of the write ahead log in bytes"""
+        try:
+            return self._dbfile.with_name(self._dbfile.name + '-wal').stat(
+                ).st_size
+        except OSError:
+            return 0
+
+    def wal_checkpoint(self, mode='PASSIVE'):
+        """Runs a WAL checkpoint
+
+        Args:
+            mode (str, optional): PASSIVE, FULL, RESTART or TRUNCATE.
+            Defaults to 'PASSIVE'.
+
+        Returns:
+            tuple: (busy, wal pages, checkpointed pages), False if error
+        """
+        if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+            return False
+        data = self.sql_read(f'PRAGMA wal_checkpoint({mode})')
+        if not data:
+            return False
+        return data[0]
+
+    def incremental_vacuum(self, pages=None):
+        """Returns free pages to the file system, only effective when the
+        database uses auto_vacuum=INCREMENTAL.
+
+        Args:
+            pages (int, optional): Maximum pages to free, None frees all.
+        """
+        if pages is None:
+            sql = 'PRAGMA incremental_vacuum'
+        else:
+            sql = f'PRAGMA incremental_vacuum({int(pages)})'
+        # The pragma frees pages as its result rows are stepped through
+        return self.sql_read(sql) is not False
+
+    def freelist_count(self):
+        data = self.sql_read('PRAGMA freelist_count')
+        if not data:
+            return 0
+        return data[0][0]
+
+    def auto_vacuum_mode(self):
+        """Returns the auto_vacuum mode, 0 - None, 1 - Full, 2 - Incremental
+        """
+        data = self.sql_read('PRAGMA auto_vacuum')
+        if not data:
+            return 0
+        return data[0][0]
+
+    def enable_incremental_vacuum(self):
+        """Converts the database to incremental auto vacuum. This runs a full
+        VACUUM and should only be used while nothing else is writing.
+
+        Returns:
+            bool: True - Database converted or already incremental
+        """
+        if self.auto_vacuum_mode() == 2:
+            return True
+
+        connection = self._get_connection()
+        try:
+            connection.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            connection.execute('VACUUM')
+        except sqlite3.Error as e:
+            self._log.warning(f'Could not enable incremental vacuum. {e}')
+            return False
+        return self.auto_vacuum_mode() == 2
+
+    def prune_datalog(self, days=CONST.DATALOG_DAYS):
+        """Deletes DataLog entries older than the retention period, in
+        batches so writers are never blocked for long.
+
+        Returns:
+            int: Number of rows deleted, False if error
+        """
+        sql = ("""DELETE FROM DataLog WHERE id IN (
+                    SELECT id FROM DataLog
+                    WHERE Timestamp < ?
+                    LIMIT ?)""")
+        cutoff = time.time() - days * 86400
+        return self._prune(sql, cutoff)
+
+    def prune_syslog(self, days=CONST.SYSLOG_DAYS,
+                     max_rows=CONST.SYSLOG_MAX_ROWS):
+        """Deletes SystemLog entries older than the retention period, then
+        the oldest entries beyond the maximum row count.
+
+        Returns:
+            int: Number of rows deleted, False if error
+        """
+        sql = ("""DELETE FROM SystemLog WHERE id IN (
+                    SELECT id FROM SystemLog
+                    WHERE Timestamp < ?
+                    LIMIT ?)""")
+        deleted = self._prune(sql, time.time() - days * 86400)
+        if deleted is False:
+            return False
+
+        data = self.sql_read('SELECT MAX(id) FROM SystemLog')
+        if not data or data[0][0] is None:
+            return deleted
+
+        sql = ("""DELETE FROM SystemLog WHERE id IN (
+                    SELECT id FROM SystemLog
+                    WHERE id <= ?
+                    LIMIT ?)""")
+        by_count = self._prune(sql, data[0][0] - max_rows)
+        if by_count is False:
+            return False
+        return deleted + by_count
+
+    def _prune(self, sql, cutoff):
+        deleted = 0
+        while True:
+            count = self.sql_write(sql, [(cutoff, CONST.DB_PRUNE_BATCH)],
+                                   caller='_prune')
+            if count is False:
+                return False
+            deleted += count
+            if count < CONST.DB_PRUNE_BATCH:
+                return deleted
+
+    def analyze(self):
+        """Rebuilds the query planner statistics"""
+        return self.sql_write('ANALYZE', caller='analyze') is not False
+
+    def optimize(self):
+        """Lets sqlite refresh any query planner statistics it considers
+        stale, this is cheap and intended to run before closing.
+        """
+        connection = self.connection
+        if connection is None:
+            return
+        try:
+            connection.execute('PRAGMA optimize')
+        except sqlite3.Error as e:
+            self._log.info(f'Database optimize failed. {e}')
+
     def close_connection(self):
-        if self.connection:
-            self.connection.close()
+        """Optimizes and closes the calling thread's connection. Other
+        threads close their own with close_thread_connection().
+        """
+        if CONST.DB_OPTIMIZE_ON_CLOSE:
+            self.optimize()
+        self.close_thread_connection()
+
+    def close_thread_connection(self):
+        """Closes the calling thread's connection"""
+        connection = self.connection
+        if connection is None:
+            return
+
+        with self._conn_lock:
+            if connection in self._connections:
+                self._connections.remove(connection)
+        connection.close()
+        self._local.connection = None
 
 
 ###############################################################################
 # Logic Engine Database Class
 ###############################################################################
 class AppDatabase(BasicDatabase):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, write_queue=None):
+        super().__init__(write_queue=write_queue)
 
 # *********** Program Functions ************
 
@@ -222,7 +614,7 @@ class AppDatabase(BasicDatabase):
         _params = [(name, mode, status, period, last_run,
                     description, label, button_text)]
 
-        ret_val = self.sql_write(sql, _params)
+        ret_val = self.sql_write(sql, _params, caller='program_write')
         if ret_val is False:
             self._log.info(f'Failed to update program ({name}), ({label}) '
                            f'({description}) ({mode}) ({status}) '
@@ -287,8 +679,37 @@ class AppDatabase(BasicDatabase):
         else:
             return [item[0] for item in data]
 
+    def program_read_all(self):
+        """Gets the attributes of every program in one query
+
+        Returns:
+            dict / None: {Name: {attribute: value}}, None if no data found
+        """
+        sql = ('''SELECT Name, Mode, Status, Period, Last_Run, Description,
+                         Label, ButtonText
+                  FROM Programs''')
+        attributes = ('Name', 'Mode', 'Status', 'Period', 'Last_Run',
+                      'Description', 'Label', 'ButtonText')
+
+        data = self.sql_read(sql)
+        if not data:
+            return None
+
+        return {row[0]: dict(zip(attributes, row)) for row in data}
+
 # ************** Data Functions ****************
 
+    DATA_WRITE_SQL = ('''INSERT INTO Data
+                             (Datapoint, Value, Type)
+                         VALUES
+                             (?, ?, ?)
+                         ON CONFLICT(Datapoint)
+                         DO UPDATE SET
+                             Value = excluded.Value
+                         WHERE
+                             (Override=? OR Override IS NULL)
+                             AND Type=excluded.Type''')
+
     def data_write(self, datapoint, value, override=None):
         """Writes a datapoint to the database
 
@@ -301,6 +722,9 @@ class AppDatabase(BasicDatabase):
         Returns:
             [bool]: True - Datapoint record was written / updated,
                     False - Datapoint record was not written / updated
+            When the write is queued to the database writer True only means
+            it was queued, whether it was accepted, for example by an
+            override blocking it, is not known.
         """
 
         if datapoint is None:
@@ -316,16 +740,7 @@ class AppDatabase(BasicDatabase):
                             f'value of None.')
             return False
 
-        sql = ('''INSERT INTO Data
-                      (Datapoint, Value, Type)
-                  VALUES
-                      (?, ?, ?)
-                  ON CONFLICT(Datapoint)
-                  DO UPDATE SET
-                      Value = excluded.Value
-                  WHERE
-                      (Override=? OR Override IS NULL)
-                      AND Type=excluded.Type''')
+        sql = self.DATA_WRITE_SQL
 
         d_type = self.typeset(value)
         if d_type not in self.TYPES:
@@ -333,7 +748,8 @@ class AppDatabase(BasicDatabase):
                               f'when updating data value ({datapoint}).')
             return False
 
-        ret_val = self.sql_write(sql, [(datapoint, value, d_type, override)])
+        ret_val = self.sql_write(sql, [(datapoint, value, d_type, override)],
+                                 queue=True, caller='data_write')
 
         if ret_val is False:
             self._log.warning(f'Failed to write datapoint ({datapoint}).')
@@ -343,6 +759,44 @@ class AppDatabase(BasicDatabase):
         else:
             return True
 
+    def data_write_many(self, values, override=None):
+        """Writes several datapoints in one transaction, invalid entries
+        are skipped as they would be by data_write().
+
+        Args:
+            values (dict): {Datapoint: Value}
+            override (str, optional): As per data_write(). Defaults to None.
+
+        Returns:
+            int / bool: Affected rows as per sql_write(), False if error.
+            When queued to the database writer the rows are not known, see
+            data_write().
+        """
+        params = list()
+        for datapoint, value in values.items():
+            if datapoint is None or value is None:
+                continue
+            if ' ' in datapoint:
+                self._log.warning(f'Can not write datapoint {datapoint}, '
+                                  'spaces are not allowed')
+                continue
+            d_type = self.typeset(value)
+            if d_type not in self.TYPES:
+                self._log.warning(f'Incorrect data type ({d_type}) used '
+                                  f'when updating data value ({datapoint}).')
+                continue
+            params.append((datapoint, value, d_type, override))
+
+        if not params:
+            return 0
+
+        ret_val = self.sql_write(self.DATA_WRITE_SQL, params, queue=True,
+                                 caller='data_write_many')
+        if ret_val is False:
+            self._log.warning(f'Failed to write datapoints '
+                              f'({", ".join(p[0] for p in params)}).')
+        return ret_val
+
     def data_read(self, datapoint=None):
         """Reads a single, tuple, or all datapoints from the database
 
@@ -370,8 +824,8 @@ class AppDatabase(BasicDatabase):
                 else:
                     datapoint = (datapoint,)
 
-            sql = (sql + " WHERE Datapoint IN (" +
-                   ",".join("?"*len(datapoint)) + ")")
+            sql = self.in_list_sql(sql + " WHERE Datapoint IN ",
+                                   len(datapoint))
 
         data = self.sql_read(sql, datapoint)
         if data is None:
@@ -385,6 +839,96 @@ class AppDatabase(BasicDatabase):
             r_dict[row[0]] = self.typecast(row[1], row[2])
         return r_dict
 
+    def data_read_with_locks(self):
+        """Reads every datapoint and its lock holder in one query
+
+        Returns:
+            tuple: ({Datapoint: Value}, {Datapoint: lock owner}), only locked
+            datapoints are in the second dict. None if no data is found,
+            False on error.
+        """
+        sql = ('''SELECT Datapoint,
+                         CASE
+                            WHEN Type='float' THEN
+                                Value + IFNULL(Calibration, 0)
+                            ELSE
+                                Value
+                            END,
+                         Type,
+                         Override
+                  FROM Data''')
+
+        data = self.sql_read(sql)
+        if data is None:
+            return None
+        elif data is False:
+            self._log.warning('Error reading datapoints and locks')
+            return False
+
+        values = dict()
+        locks = dict()
+        for row in data:
+            values[row[0]] = self.typecast(row[1], row[2])
+            if row[3] is not None:
+                locks[row[0]] = row[3]
+        return values, locks
+
+    def data_change_id(self):
+        """Returns the current position of the data change feed, every
+        change to a datapoint value is recorded in DataLog so its newest id
+        marks the latest change.
+
+        Returns:
+            int: The newest change id, 0 if there are none, False if error
+        """
+        data = self.sql_read('''SELECT MAX(id) FROM DataLog''')
+        if data is False:
+            return False
+        if not data or data[0][0] is None:
+            return 0
+        return data[0][0]
+
+    def data_changes(self, after_id):
+        """Returns the datapoints whose value changed after a change id
+
+        Args:
+            after_id (int): Change id from a previous call or from
+                            data_change_id()
+
+        Returns:
+            tuple: (newest change id, {Datapoint1: Value1, ...})
+            The id is smaller than after_id if the change log was emptied
+            and restarted, callers should then re-read everything.
+            False if error
+        """
+        change_id = self.data_change_id()
+        if change_id is False:
+            return False
+        if change_id <= after_id:
+            return change_id, dict()
+
+        sql = ('''SELECT Datapoint,
+                         CASE
+                            WHEN Type='float' THEN
+                                Value + IFNULL(Calibration, 0)
+                            ELSE
+                                Value
+                            END,
+                         Type
+                  FROM Data
+                  WHERE id IN (SELECT Data_ID FROM DataLog
+                               WHERE id > ? AND id <= ?)''')
+
+        data = self.sql_read(sql, (after_id, change_id))
+        if data is False:
+            self._log.warning(f'Error reading data changes after {after_id}')
+            return False
+
+        r_dict = dict()
+        for row in data or ():
+            r_dict[row[0]] = self.typecast(row[1], row[2])
+        return change_id, r_dict
+
     def data_search(self, search):
         """Returns datapoints where the name contains the search string
 
@@ -451,7 +995,8 @@ class AppDatabase(BasicDatabase):
                               f'({owner}:{setting}).')
             return False
 
-        ret_val = self.sql_write(sql, [(owner, setting, value, d_type)])
+        ret_val = self.sql_write(sql, [(owner, setting, value, d_type)],
+                                 caller='setting_write')
 
         if ret_val is False:
             self._log.warning(f'Failed to write setting ({owner}:{setting}).')
@@ -461,6 +1006,19 @@ class AppDatabase(BasicDatabase):
         else:
             return True
 
+    def settings_version(self):
+        """Returns the Settings change counter, it increases whenever a
+        setting is added, removed or its value changes.
+
+        Returns:
+            int: The current version, None if it could not be read
+        """
+        sql = ("""SELECT Version FROM Versions WHERE Name='Settings'""")
+        data = self.sql_read(sql)
+        if not data:
+            return None
+        return data[0][0]
+
     def setting_read_single(self, owner, setting):
         """Returns the requested setting from the database
 
@@ -582,7 +1140,8 @@ class AlarmDatabase(BasicDatabase):
             datapoint (str): Related datapoint
             operation (str): The related logic operator
             value (str): The trigger value
-            delay (int): alarm delay
+            delay (float): Seconds the condition must hold before the
+                           alarm activates
             priority (int): 1-high, 2-med, 3-low
             enabled (bool): defaults to True
             status (str): Alarm status ('CLR', 'ACT', 'ACK', 'SIL')
@@ -618,6 +1177,14 @@ class AlarmDatabase(BasicDatabase):
         if operation not in ('eq', 'ne', 'gt', 'ge', 'lt', 'le', None):
             return False
 
+        if delay is not None:
+            try:
+                delay = float(delay)
+            except ValueError:
+                self._log.warning(f'Incorrect delay ({delay}) used to update '
+                                  f'alarm ({alarm_name}).')
+                return False
+
         d_type = None
         if value is not None:
             d_type = self.typeset(value)
@@ -638,7 +1205,7 @@ class AlarmDatabase(BasicDatabase):
                                      d_type,
                                      delay,
                                      priority,
-                                     status)]):
+                                     status)], caller='write_alarm'):
             self._log.warning(f'Failure to write alarm ({alarm_name})')
             return False
         else:
@@ -662,7 +1229,7 @@ class AlarmDatabase(BasicDatabase):
         if parameters is None:
             params = ('Name, Description, Enabled, LastEvent, Status, '
                       'Datapoint, Operation, Value, ValType, Delay, '
-                      'Count, Priority')
+                      'Priority')
         else:
             params = ''
             if 'Name' not in parameters:
@@ -676,8 +1243,9 @@ class AlarmDatabase(BasicDatabase):
         if alarm_names is None:
             sql = (f'''SELECT {params} FROM Alarms''')
         else:
-            names = ', '.join('?' * len(alarm_names))
-            sql = (f'''SELECT {params} FROM Alarms WHERE Name in ({names})''')
+            sql = self.in_list_sql(
+                f'''SELECT {params} FROM Alarms WHERE Name in ''',
+                len(alarm_names))
 
         data = self.sql_read(sql, alarm_names)
 
@@ -726,12 +1294,10 @@ class AlarmDatabase(BasicDatabase):
             if type(names) is not tuple:
                 names = (names,)
 
-            a_str = ', '.join('"{0}"'.format(i) for i in names)
-
-        sql = (f'''UPDATE Alarms SET
+        sql = self.in_list_sql('''UPDATE Alarms SET
                Status="ACT", LastEvent=((julianday('now') - 2440587.5)*86400.0)
-               WHERE Name IN ({a_str})''')
-        if self.sql_write(sql) is False:
+               WHERE Name IN ''', len(names))
+        if self.sql_write(sql, [names], caller='activate_alarms') is False:
             self._log.warning(f'Failure to activate alarm(s) ({names}).')
             return False
         else:
@@ -742,7 +1308,7 @@ class AlarmDatabase(BasicDatabase):
         """
         sql = '''UPDATE Alarms SET Status="ACK"
                  WHERE NOT instr(Status, "CLR")'''
-        if self.sql_write(sql) is False:
+        if self.sql_write(sql, caller='acknowledge_alarms') is False:
             self._log.warning(f'Failure to acknowledge alarm(s).')
             return False
         else:
@@ -752,7 +1318,7 @@ class AlarmDatabase(BasicDatabase):
         """Silences any active alarms.
         """
         sql = '''UPDATE Alarms SET Status="SIL" WHERE Status="ACT"'''
-        if self.sql_write(sql) is False:
+        if self.sql_write(sql, caller='silence_alarms') is False:
             self._log.warning(f'Failure to silence alarm(s).')
             return False
         else:
@@ -762,17 +1328,33 @@ class AlarmDatabase(BasicDatabase):
         """Clears any acknowledged alarms.
         """
         sql = '''UPDATE Alarms SET Status="CLR" WHERE Status="ACLR"'''
-        if self.sql_write(sql) is False:
+        if self.sql_write(sql, caller='clear_alarms') is False:
             self._log.warning(f'Failure to clear alarm(s).')
             return False
         else:
             return True
 
-    def get_alarm_history(self, human_time=False):
-        """Return the entries in the alarm history log
+    def alarm_version(self):
+        """Returns the Alarms change counter, it increases whenever an alarm
+        or the alarm history changes.
+
+        Returns:
+            int: The current version, None if it could not be read
+        """
+        sql = ("""SELECT Version FROM Versions WHERE Name='Alarms'""")
+        data = self.sql_read(sql)
+        if not data:
+            return None
+        return data[0][0]
+
+    def get_alarm_history(self, human_time=False, after_id=None, limit=None):
+        """Return the entries in the alarm history log, newest first
 
         Args:
-            length (int, optional): how many record to return, None = all
+            human_time (bool, optional): Format the time for display
+            after_id (int, optional): Only entries with a log_id greater
+            than this, None = all
+            limit (int, optional): how many record to return, None = all
         Returns:
             list of dict: A list of dicts, each dict is one entry.
         """
@@ -782,16 +1364,19 @@ class AlarmDatabase(BasicDatabase):
                       Alarms.Name,
                       Alarms.Description,
                       AlarmsLog.Status,
-                      Alarms.Priority
+                      Alarms.Priority,
+                      AlarmsLog.id
                   FROM
-                      Alarms,
                       AlarmsLog
+                  JOIN
+                      Alarms ON AlarmsLog.Alarm_ID=Alarms.ID
                   WHERE
-                      AlarmsLog.Alarm_ID=Alarms.ID
+                      AlarmsLog.id > IFNULL(:after_id, 0)
                   ORDER BY
-                      AlarmsLog.Timestamp DESC""")
+                      AlarmsLog.id DESC
+                  LIMIT IFNULL(:limit, -1)""")
 
-        entries = self.sql_read(sql)
+        entries = self.sql_read(sql, {'after_id': after_id, 'limit': limit})
 
         if not entries:
             return None
@@ -799,9 +1384,7 @@ class AlarmDatabase(BasicDatabase):
         r_list = list()
         for entry in entries:
             if human_time:
-                t = time.localtime(entry[0])
-                msec = str(entry[0]).split('.')[1][:3]
-                alarm_time = time.strftime("%Y-%m-%d %H:%M:%S", t) + '.' + msec
+                alarm_time = format_time(entry[0])
             else:
                 alarm_time = str(entry[0])
             r_list.append({'alarm_time': alarm_time,
@@ -809,19 +1392,19 @@ class AlarmDatabase(BasicDatabase):
                            'alarm_name': str(entry[2]),
                            'alarm_description': str(entry[3]),
                            'alarm_status': str(entry[4]),
-                           'alarm_priority': str(entry[5])})
+                           'alarm_priority': str(entry[5]),
+                           'log_id': str(entry[6])})
         return r_list
 
     def get_alarms(self, human_time=False):
         """Returns any alarms that are not in the CLR state
 
         Args:
-            length (int, optional): how many record to return, None = all
+            human_time (bool, optional): Format the time for display
 
         Returns:
             list of dict: A list of dicts, each dict is one entry.
         """
-        pass
         sql = ("""SELECT id,
                          LastEvent,
                          Name,
@@ -838,10 +1421,8 @@ class AlarmDatabase(BasicDatabase):
 
         r_list = list()
         for entry in entries:
-            if human_time:
-                t = time.localtime(entry[1])
-                msec = str(entry[1]).split('.')[1][:3]
-                alarm_time = time.strftime("%Y-%m-%d %H:%M:%S", t) + '.' + msec
+            if human_time and entry[1] is not None:
+                alarm_time = format_time(entry[1])
             else:
                 alarm_time = str(entry[1])
             r_list.append({'alarm_id': str(entry[0]),
@@ -938,7 +1519,7 @@ class GUIDatabase(AppDatabase):
 
         _params = [(mode, period, description, label, button_text, name)]
 
-        ret_val = self.sql_write(sql, _params)
+        ret_val = self.sql_write(sql, _params, caller='program_write')
         if ret_val is False:
             self._log.info(f'Failed to update program ({name}), ({label}) '
                            f'({description}) ({mode}) '
@@ -1017,7 +1598,8 @@ class GUIDatabase(AppDatabase):
 
         override = str(owner)
 
-        r_val = self.sql_write(sql, [(override, datapoint, override)])
+        r_val = self.sql_write(sql, [(override, datapoint, override)],
+                               caller='data_lock')
 
         if r_val is False:
             self._log.warning(f'Failure to override datapoint ({datapoint}) '
@@ -1049,7 +1631,8 @@ class GUIDatabase(AppDatabase):
 
         override = str(owner)
 
-        r_val = self.sql_write(sql, [(None, datapoint, override)])
+        r_val = self.sql_write(sql, [(None, datapoint, override)],
+                               caller='data_unlock')
 
         if r_val is False:
             self._log.warning(f'Failure to clear override on datapoint '
@@ -1085,7 +1668,8 @@ class GUIDatabase(AppDatabase):
         except ValueError:
             return False
 
-        ret_val = self.sql_write(sql, [(value, datapoint)])
+        ret_val = self.sql_write(sql, [(value, datapoint)],
+                                 caller='data_set_calibration')
 
         if ret_val is False:
             self._log.warning(f'Failed to set calibration for {datapoint}.')
@@ -1142,17 +1726,50 @@ class GUIDatabase(AppDatabase):
     def get_syslog_entries(self,
                            name=None,
                            daterange=(None, None),
-                           human_time=False):
-        """Returns requested log entries
+                           human_time=False,
+                           level=None,
+                           after_id=None,
+                           before_id=None,
+                           limit=None):
+        """Returns requested log entries, newest first
+
+        Entries are paged by their id, for example the newest 100 entries
+        with limit=100, then only the entries added since with
+        after_id=<newest log_entry returned>.
 
         Args:
-            name (str): Log entry source name
-            daterange (tuple): (start date, stop date) Unix timestamps,
-            None removes that date limit
+            name (str, optional): Log entry source name
+            daterange (tuple, optional): (start date, stop date) Unix
+            timestamps, None removes that date limit
+            human_time (bool, optional): Format the time for display
+            level (str, optional): Log level, for example 'ERROR'
+            after_id (int, optional): Only entries newer than this id
+            before_id (int, optional): Only entries older than this id
+            limit (int, optional): Maximum number of entries, None = all
 
         Returns:
             list of dict:
         """
+        where = list()
+        parameters = dict()
+        if name is not None:
+            where.append('Name = :name')
+            parameters['name'] = name
+        if level is not None:
+            where.append('Level = :level')
+            parameters['level'] = level
+        if after_id is not None:
+            where.append('id > :after_id')
+            parameters['after_id'] = after_id
+        if before_id is not None:
+            where.append('id < :before_id')
+            parameters['before_id'] = before_id
+        if daterange[0] is not None:
+            where.append('Timestamp >= :start')
+            parameters['start'] = daterange[0]
+        if daterange[1] is not None:
+            where.append('Timestamp <= :end')
+            parameters['end'] = daterange[1]
 
         sql = ("""
                 SELECT
@@ -1162,26 +1779,13 @@ class GUIDatabase(AppDatabase):
                     Level,
                     Message
                 FROM
-                    SystemLog
-                WHERE
-                    Timestamp
-                        BETWEEN
-                            IFNULL(:start, 0)
-                        AND
-                            IFNULL(:end, :current)
-                AND
-                    CASE WHEN :name IS NOT NULL
-                        THEN Name = :name
-                        ELSE 1
-                    END
-                ORDER BY
-                    Timestamp
-                DESC""")
-
-        parameters = {'name': name,
-                      'start': daterange[0],
-                      'end': daterange[1],
-                      'current': time.time()}
+                    SystemLog""")
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY id DESC'
+        if limit is not None:
+            sql += ' LIMIT :limit'
+            parameters['limit'] = limit
 
         entries = self.sql_read(sql, parameters)
         if not entries:
@@ -1190,9 +1794,7 @@ class GUIDatabase(AppDatabase):
         r_list = list()
         for entry in entries:
             if human_time:
-                t = time.localtime(entry[1])
-                msec = str(entry[1]).split('.')[1][:3]
-                log_time = time.strftime("%Y-%m-%d %H:%M:%S", t) + '.' + msec
+                log_time = format_time(entry[1])
             else:
                 log_time = str(entry[1])
             r_list.append({'log_entry': str(entry[0]),
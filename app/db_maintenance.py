@@ -0,0 +1,128 @@
+import time
+
+from app.constants import CONST
+from app.syslog import get_local_log
+
+
+class DBMaintenance:
+    """Database housekeeping run from the LogicPi supervisor loop.
+
+    Checkpointing here, between process checks, keeps the WAL below the
+    automatic checkpoint threshold in CONST.DB_PRAGMAS, so a checkpoint
+    rarely lands inside a program's cycle.
+
+    - PASSIVE checkpoint every CONST.DB_CHECKPOINT_TIME, TRUNCATE once the
+      WAL is larger than CONST.DB_WAL_TRUNCATE_SIZE
+    - DataLog / SystemLog retention pruning followed by an incremental
+      vacuum every CONST.DB_PRUNE_TIME
+    - ANALYZE / PRAGMA optimize every CONST.DB_OPTIMIZE_TIME
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.log = get_local_log('DB_Maint')
+
+        now = time.monotonic()
+        self._checkpoint_time = now + CONST.DB_CHECKPOINT_TIME
+        self._prune_time = now + CONST.DB_PRUNE_TIME
+        self._optimize_time = now + CONST.DB_OPTIMIZE_TIME
+
+        self.stats = {'wal_size': 0,
+                      'checkpoint_mode': None,
+                      'checkpoint_time': 0.0,
+                      'checkpoint_busy': False,
+                      'checkpoint_max': 0.0,
+                      'checkpoints': 0}
+
+    def startup(self):
+        """One off tasks, run before any programs are started"""
+        self.database.create_tables()
+
+        if CONST.DB_AUTO_VACUUM and self.database.auto_vacuum_mode() != 2:
+            t1 = time.monotonic()
+            if self.database.enable_incremental_vacuum():
+                self.log.info(f'Database converted to incremental vacuum '
+                              f'in {time.monotonic() - t1:.1f}s.')
+
+        self.prune()
+
+    def run(self):
+        """Runs any maintenance that is due, call this at a quiet moment"""
+        now = time.monotonic()
+
+        if now > self._checkpoint_time:
+            self.checkpoint()
+            self._checkpoint_time = now + CONST.DB_CHECKPOINT_TIME
+
+        if now > self._prune_time:
+            self.prune()
+            self._prune_time = now + CONST.DB_PRUNE_TIME
+
+        if now > self._optimize_time:
+            self.optimize()
+            self._optimize_time = now + CONST.DB_OPTIMIZE_TIME
+
+    def checkpoint(self, mode=None):
+        size = self.database.wal_size()
+        if mode is None:
+            if size > CONST.DB_WAL_TRUNCATE_SIZE:
+                mode = 'TRUNCATE'
+            else:
+                mode = 'PASSIVE'
+
+        t1 = time.monotonic()
+        result = self.database.wal_checkpoint(mode)
+        duration = time.monotonic() - t1
+
+        busy = bool(result and result[0])
+        self.stats['wal_size'] = size
+        self.stats['checkpoint_mode'] = mode
+        self.stats['checkpoint_time'] = duration
+        self.stats['checkpoint_busy'] = busy
+        self.stats['checkpoint_max'] = max(duration,
+                                           self.stats['checkpoint_max'])
+        self.stats['checkpoints'] += 1
+
+        if result is False:
+            self.log.warning(f'{mode} WAL checkpoint failed.')
+        elif duration > CONST.DB_CHECKPOINT_WARN:
+            self.log.warning(f'{mode} WAL checkpoint took {duration:.3f}s, '
+                             f'WAL size {size} bytes.')
+        elif busy and mode == 'TRUNCATE':
+            self.log.info(f'TRUNCATE WAL checkpoint blocked by a reader, '
+                          f'WAL size {size} bytes.')
+        else:
+            self.log.debug(f'{mode} WAL checkpoint took {duration:.3f}s, '
+                           f'WAL size {size} bytes.')
+
+    def prune(self):
+        t1 = time.monotonic()
+        deleted = self.database.prune_datalog()
+        if deleted is False:
+            self.log.warning('DataLog retention pruning failed.')
+            return
+
+        syslog = self.database.prune_syslog()
+        if syslog is False:
+            self.log.warning('SystemLog retention pruning failed.')
+        else:
+            deleted += syslog
+
+        freed = self.database.freelist_count()
+        if freed:
+            self.database.incremental_vacuum()
+
+        self.log.info(f'Database pruned {deleted} rows, released {freed} '
+                      f'pages in {time.monotonic() - t1:.2f}s. '
+                      f'WAL {self.stats["wal_size"]} bytes, '
+                      f'last checkpoint '
+                      f'{self.stats["checkpoint_time"]:.3f}s, '
+                      f'max {self.stats["checkpoint_max"]:.3f}s.')
+        self.stats['checkpoint_max'] = 0.0
+
+    def optimize(self):
+        t1 = time.monotonic()
+        self.database.analyze()
+        self.database.optimize()
+        self.log.info(f'Database statistics rebuilt in '
+                      f'{time.monotonic() - t1:.2f}s.')
@@ -0,0 +1,75 @@
+import queue
+import time
+
+from app.constants import CONST
+from app.database import BasicDatabase
+from app.syslog import get_worker_log
+
+
+def db_writer(write_queue, log_queue):
+    """Single writer process, enabled with CONST.DB_WRITER.
+
+    Programs put (sql, data) write intents on write_queue instead of
+    writing to the database themselves. Everything received within one
+    CONST.DB_WRITER_TICK is committed as a single transaction, so SQLite's
+    write lock is only ever taken by this process and once per tick.
+    Reads are unaffected and continue over each program's own connection.
+
+    Put None on the queue to flush any pending writes and stop the writer.
+    """
+    log = get_worker_log('DB_Writer', log_queue)
+    database = BasicDatabase()
+    log.info('Database writer started.')
+
+    running = True
+    commits = 0
+    statements = 0
+    report_time = time.monotonic() + CONST.DB_LOCK_REPORT_TIME
+
+    while running:
+        try:
+            item = write_queue.get(timeout=1)
+        except queue.Empty:
+            item = False
+
+        batch = list()
+        tick_end = time.monotonic() + CONST.DB_WRITER_TICK
+        while item is not False:
+            if item is None:
+                running = False
+                # Collect anything already queued behind the stop request
+                try:
+                    while True:
+                        item = write_queue.get_nowait()
+                        if item is not None:
+                            batch.append(item)
+                except queue.Empty:
+                    break
+            else:
+                batch.append(item)
+
+            timeout = tick_end - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = write_queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+
+        if batch:
+            failed = database.sql_write_batch(batch, caller='db_writer')
+            if failed:
+                log.warning(f'{failed} of {len(batch)} queued writes failed.')
+            commits += 1
+            statements += len(batch)
+
+        if time.monotonic() > report_time:
+            if commits:
+                log.info(f'{statements} writes grouped into {commits} '
+                         f'commits.')
+            commits = 0
+            statements = 0
+            report_time = time.monotonic() + CONST.DB_LOCK_REPORT_TIME
+
+    database.close_connection()
+    log.info('Database writer stopped.')
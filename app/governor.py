@@ -0,0 +1,155 @@
+from app.constants import CONST
+
+
+def cpu_times():
+    """Returns (busy, total) jiffies for all CPUs from /proc/stat, None if
+    it is not available.
+    """
+    try:
+        with open('/proc/stat') as f:
+            fields = [int(value) for value in f.readline().split()[1:]]
+    except (OSError, ValueError):
+        return None
+    # idle and iowait
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+    total = sum(fields[:8])
+    return total - idle, total
+
+
+class Governor:
+    """Sheds load by stretching the periods of less critical programs.
+
+    LogicPi calls update() every CONST.GOVERNOR_TIME. The load level is
+    raised when the CPU is busier than CONST.GOVERNOR_CPU_HIGH and lowered
+    once it is below CONST.GOVERNOR_CPU_LOW. Each level of
+    CONST.GOVERNOR_LEVELS multiplies the periods of the programs with the
+    listed criticality, HIGH programs are never stretched.
+
+    Overruns are dealt with per program. A LOW or NORMAL program that
+    overran has its own period doubled, up to CONST.GOVERNOR_OVERRUN_MAX,
+    and halved again after CONST.GOVERNOR_OVERRUN_RELAX updates without an
+    overrun. Overruns of HIGH programs are only logged.
+
+    The multipliers are handed to the programs through their heartbeat
+    slots, changes are logged and the level and CPU load are written to
+    the Governor_Level and CPU_Load datapoints.
+    """
+
+    def __init__(self, programs, heartbeats, database, log):
+        """programs is {program name: criticality}"""
+        self.programs = programs
+        self.heartbeats = heartbeats
+        self.database = database
+        self.log = log
+        self.level = 0
+        self._cpu = cpu_times()
+        self._overruns = {name: heartbeats.overruns(name)
+                          for name in programs}
+        # {program name: [own multiplier, updates without an overrun]}
+        self._offenders = dict()
+        self._high_overruns = set()
+        self.database.data_write('Governor_Level', 0.0)
+
+    def update(self):
+        cpu = self._cpu_load()
+        overruns = dict()
+        for name in self.programs:
+            count = self.heartbeats.overruns(name)
+            if count > self._overruns[name]:
+                overruns[name] = count - self._overruns[name]
+            self._overruns[name] = count
+
+        if cpu is not None:
+            self.database.data_write('CPU_Load', round(cpu * 100, 1))
+
+        self._report_high(overruns)
+        changed = self._update_offenders(overruns)
+
+        busy = cpu is not None and cpu > CONST.GOVERNOR_CPU_HIGH
+        idle = cpu is None or cpu < CONST.GOVERNOR_CPU_LOW
+        if busy and self.level < len(CONST.GOVERNOR_LEVELS):
+            self.set_level(self.level + 1, f'CPU {cpu * 100:.0f}%')
+        elif idle and self.level > 0:
+            reason = f'CPU {cpu * 100:.0f}%' if cpu is not None else 'CPU n/a'
+            self.set_level(self.level - 1, reason)
+        elif changed:
+            self._apply()
+
+    def set_level(self, level, reason=''):
+        self.level = level
+        stretch = self._apply()
+        applied = ', '.join(f'{criticality} x{factor}'
+                            for criticality, factor in stretch.items())
+        self.log.warning(f'Load level {level} ({reason}), periods: '
+                         f'{applied or "normal"}.')
+        self.database.data_write('Governor_Level', float(level))
+
+    def _apply(self):
+        """Sets each program's multiplier, the load level's for its
+        criticality times its own for overrunning. Returns the level's.
+        """
+        level = self.level
+        stretch = CONST.GOVERNOR_LEVELS[level - 1] if level else dict()
+        for name, criticality in self.programs.items():
+            own = self._offenders.get(name, (1,))[0]
+            self.heartbeats.set_stretch(
+                name, stretch.get(criticality, 1.0) * own)
+        return stretch
+
+    def _report_high(self, overruns):
+        """HIGH programs are never stretched, their overruns are logged"""
+        high = {name for name in overruns if self.programs[name] == 'HIGH'}
+        for name in sorted(high - self._high_overruns):
+            self.log.warning(f'Program {name} is overrunning its period, '
+                             f'it is HIGH criticality and is not stretched.')
+        for name in sorted(self._high_overruns - high):
+            self.log.info(f'Program {name} is no longer overrunning its '
+                          f'period.')
+        self._high_overruns = high
+
+    def _update_offenders(self, overruns):
+        """Stretches the LOW and NORMAL programs that overran, and relaxes
+        those that have stopped. Returns True if a multiplier changed.
+        """
+        changed = False
+        for name in overruns:
+            if self.programs[name] == 'HIGH':
+                continue
+            offender = self._offenders.setdefault(name, [1, 0])
+            offender[1] = 0
+            if offender[0] < CONST.GOVERNOR_OVERRUN_MAX:
+                offender[0] = min(offender[0] * 2,
+                                  CONST.GOVERNOR_OVERRUN_MAX)
+                changed = True
+                self.log.warning(f'Program {name} overran its period '
+                                 f'{overruns[name]} times, its period is '
+                                 f'x{offender[0]}.')
+
+        for name, offender in list(self._offenders.items()):
+            if name in overruns:
+                continue
+            offender[1] += 1
+            if offender[1] < CONST.GOVERNOR_OVERRUN_RELAX:
+                continue
+            offender[0] //= 2
+            offender[1] = 0
+            changed = True
+            if offender[0] <= 1:
+                del self._offenders[name]
+                self.log.info(f'Program {name} period restored.')
+            else:
+                self.log.info(f'Program {name} period relaxed to '
+                              f'x{offender[0]}.')
+        return changed
+
+    def _cpu_load(self):
+        """Fraction of CPU time used since the last update"""
+        current = cpu_times()
+        previous, self._cpu = self._cpu, current
+        if current is None or previous is None:
+            return None
+        busy = current[0] - previous[0]
+        total = current[1] - previous[1]
+        if total <= 0:
+            return None
+        return busy / total
@@ -0,0 +1,135 @@
+import multiprocessing as mp
+import time
+
+
+class HeartbeatTable:
+    """Program heartbeats kept in shared memory for the supervisor.
+
+    Created by LogicPi before the programs are started, each program is
+    given its own slot with heartbeat(name). A slot is only written by its
+    program and read by the supervisor, so no lock is used. The exception
+    is STRETCH, which is written by the governor and only read by the
+    program.
+    """
+    COUNT = 0
+    TIME = 1
+    STARTED = 2
+    # Cycle lateness, how long after it was due each cycle started
+    LATE_COUNT = 3
+    LATE_TOTAL = 4
+    LATE_MAX = 5
+    # Period multiplier set by the governor, 0 is the same as 1
+    STRETCH = 6
+    # Cycles that took longer than the program's period
+    OVERRUNS = 7
+    # time.monotonic() of the first successful cycle since the process was
+    # started, 0 until then
+    READY = 8
+    SLOT_SIZE = 9
+
+    def __init__(self, names):
+        self._index = {name: i for i, name in enumerate(names)}
+        self._array = mp.RawArray('d', len(self._index) * self.SLOT_SIZE)
+        # Lateness reports made by the supervisor, a program starts a new
+        # LATE_MAX when it sees this change
+        self._reports = mp.RawValue('L', 0)
+
+    def heartbeat(self, name):
+        return Heartbeat(self._array, self._index[name] * self.SLOT_SIZE,
+                         self._reports)
+
+    def read(self, name):
+        """Returns (cycle count, time.monotonic() of the last cycle)"""
+        base = self._index[name] * self.SLOT_SIZE
+        return (int(self._array[base + self.COUNT]),
+                self._array[base + self.TIME])
+
+    def started(self, name):
+        """Returns the time.monotonic() of the first cycle since the process
+        was started, 0 if it has not run a cycle yet.
+        """
+        return self._array[self._index[name] * self.SLOT_SIZE + self.STARTED]
+
+    def ready(self, name):
+        return self._array[self._index[name] * self.SLOT_SIZE + self.READY]
+
+    def overruns(self, name):
+        base = self._index[name] * self.SLOT_SIZE
+        return int(self._array[base + self.OVERRUNS])
+
+    def set_stretch(self, name, stretch):
+        base = self._index[name] * self.SLOT_SIZE
+        self._array[base + self.STRETCH] = stretch
+
+    def stretch(self, name):
+        base = self._index[name] * self.SLOT_SIZE
+        return self._array[base + self.STRETCH] or 1.0
+
+    def lateness(self, name):
+        """Returns (cycles measured, total lateness, max lateness) in
+        seconds. The maximum covers the cycles since the last
+        lateness_reported(). The counters only increase, compare with a
+        previous read for the average.
+        """
+        base = self._index[name] * self.SLOT_SIZE
+        return (int(self._array[base + self.LATE_COUNT]),
+                self._array[base + self.LATE_TOTAL],
+                self._array[base + self.LATE_MAX])
+
+    def lateness_reported(self):
+        """Starts a new lateness maximum in every program"""
+        self._reports.value += 1
+
+
+class Heartbeat:
+    """A program's slot in the HeartbeatTable"""
+
+    def __init__(self, array, base, reports):
+        self._array = array
+        self._base = base
+        self._reports = reports
+        self._reports_seen = 0
+
+    def beat(self, late=None):
+        """Records that the program has started a cycle, late seconds after
+        it was due.
+        """
+        now = time.monotonic()
+        array = self._array
+        base = self._base
+        array[base + HeartbeatTable.TIME] = now
+        array[base + HeartbeatTable.COUNT] += 1
+        if not array[base + HeartbeatTable.STARTED]:
+            array[base + HeartbeatTable.STARTED] = now
+        if self._reports.value != self._reports_seen:
+            self._reports_seen = self._reports.value
+            array[base + HeartbeatTable.LATE_MAX] = 0
+        if late is not None:
+            array[base + HeartbeatTable.LATE_COUNT] += 1
+            array[base + HeartbeatTable.LATE_TOTAL] += late
+            if late > array[base + HeartbeatTable.LATE_MAX]:
+                array[base + HeartbeatTable.LATE_MAX] = late
+
+    def set_ready(self):
+        """Records that the program has completed its first successful
+        cycle, see LogicPi's readiness barrier.
+        """
+        if not self._array[self._base + HeartbeatTable.READY]:
+            self._array[self._base + HeartbeatTable.READY] = time.monotonic()
+
+    def overrun(self):
+        """Records a cycle that took longer than the program's period"""
+        self._array[self._base + HeartbeatTable.OVERRUNS] += 1
+
+    @property
+    def stretch(self):
+        """The governor's multiplier for the program's period"""
+        return self._array[self._base + HeartbeatTable.STRETCH] or 1.0
+
+    def reset(self):
+        """Dates the last cycle to now, called when the process is started
+        so a program is given its full stall time to start running.
+        """
+        self._array[self._base + HeartbeatTable.TIME] = time.monotonic()
+        self._array[self._base + HeartbeatTable.STARTED] = 0
+        self._array[self._base + HeartbeatTable.READY] = 0
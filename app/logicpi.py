@@ -1,6 +1,9 @@
 import multiprocessing as mp
 import time
 import os
+import gc
+
+from multiprocessing.connection import wait
 
 import inspect
 
@@ -11,25 +14,148 @@ from app.database import AppDatabase
 from app.database import OP_MODE, OP_STATE
 from app.program import load_programs
 from app.alarm_scan import Alarm_Scan
+from app.db_writer import db_writer
+from app.db_maintenance import DBMaintenance
+from app.heartbeat import HeartbeatTable
+from app.program_group import ProgramGroup
+from app.scan_cycle import ScanCycle
+from app.scheduling import run_unit
+from app.governor import Governor
+
+
+def process_stats(pid):
+    """Returns the resident and proportional set sizes of a process in kB,
+    PSS splits pages shared with the parent between the processes sharing
+    them, and its total context switches. None if /proc is not available.
+    """
+    stats = dict()
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('Rss', 'Pss'):
+                    stats[key] = int(value.split()[0])
+        with open(f'/proc/{pid}/status') as f:
+            stats['Switches'] = sum(int(value) for key, _, value in
+                                    (line.partition(':') for line in f)
+                                    if key.endswith('ctxt_switches'))
+    except (OSError, ValueError, IndexError):
+        return None
+    return stats
 
 
 class LogicPi:
+    CONTROL_STOP = b'S'
+
     def __init__(self):
         self.name = 'LogicPi'
+        self.start_time = time.monotonic()
         self.database = AppDatabase()
         self.database.setting_write(self.name, 'Enabled', True)
 
         self.log = get_local_log(self.name)
         self.log.info(f'Starting LogicPi, main App PID: {os.getpid()}')
 
+        self.maintenance = DBMaintenance(self.database)
+        self.maintenance.startup()
+
         self.log_queue = mp.Queue(-1)
         self.log_listener = mp.Process(target=log_listener,
                                        args=(self.log_queue,))
         self.log_listener.start()
 
+        self.write_queue = None
+        self.db_writer = None
+        if CONST.DB_WRITER:
+            self.write_queue = mp.Queue(-1)
+            self.start_db_writer()
+
         self.program_fails = dict()
-        self.programs = load_programs('programs', self.log_queue)
-        self.programs.append(Alarm_Scan(self.log_queue))
+        self.programs = load_programs('programs', self.log_queue,
+                                      self.write_queue)
+        self.programs.append(Alarm_Scan(self.log_queue, self.write_queue))
+        self.heartbeats = HeartbeatTable([program.name
+                                          for program in self.programs])
+        for program in self.programs:
+            program.heartbeat = self.heartbeats.heartbeat(program.name)
+
+        # Each unit is run in its own process, a program, a group of
+        # programs sharing one process or the scan cycle. Processes,
+        # failures and restarts are tracked per unit.
+        self.units = dict()
+        self.members = dict()
+        groups = dict()
+        scan = list()
+        for program in self.programs:
+            if program.scan_order is not None:
+                scan.append(program)
+            elif program.group is None:
+                self.units[program.name] = program
+                self.members[program.name] = [program.name]
+            else:
+                groups.setdefault(program.group, list()).append(program)
+        for group, programs in groups.items():
+            unit = ProgramGroup(group, programs, self.log_queue)
+            self.units[unit.name] = unit
+            self.members[unit.name] = [program.name for program in programs]
+        if scan:
+            unit = ScanCycle(scan, self.log_queue, self.write_queue)
+            self.units[unit.name] = unit
+            self.members[unit.name] = [program.name
+                                       for program in unit.programs]
+        unit_of = {program: name for name, members in self.members.items()
+                   for program in members}
+
+        # Readiness barrier, a unit is started once the units providing the
+        # datapoints its programs require are ready. Datapoints no program
+        # provides are not waited for.
+        providers = {datapoint: unit_of[program.name]
+                     for program in self.programs
+                     for datapoint in program.provides}
+        self.depends = {name: dict() for name in self.units}
+        for program in self.programs:
+            name = unit_of[program.name]
+            for datapoint in program.requires:
+                provider = providers.get(datapoint)
+                if provider is not None and provider != name:
+                    self.depends[name].setdefault(provider, list()).append(
+                        datapoint)
+
+        # A group shares one process so its members must agree on the
+        # scheduling settings, the first member's are used
+        self.scheduling = dict()
+        for program in self.programs:
+            settings = program.scheduling
+            if not settings:
+                continue
+            name = unit_of[program.name]
+            if name not in self.scheduling:
+                self.scheduling[name] = settings
+            elif self.scheduling[name] != settings:
+                self.log.warning(f'Program {program.name} has different '
+                                 f'scheduling settings to the rest of '
+                                 f'{name}, they are ignored.')
+
+        self.processes = dict()
+        # Units waiting on the readiness barrier
+        self.pending = set()
+        # {unit name: time.monotonic() the process was last started}
+        self.started = dict()
+        # {unit name: time.monotonic() the restart was requested}
+        self.restarts = dict()
+        # {unit name: (context switches, time.monotonic())}
+        self.switches = dict()
+        # {program name: (cycles, total lateness)}
+        self.lateness = dict()
+        self.governor = Governor({program.name: program.criticality
+                                  for program in self.programs},
+                                 self.heartbeats, self.database, self.log)
+
+        # Self-pipe that wakes the supervisor loop, it is written from
+        # signal handlers so only os.write() is used on it
+        self._control, self._control_send = os.pipe()
+        os.set_blocking(self._control, False)
+        os.set_blocking(self._control_send, False)
 
     def safe_shutdown(self, signum, frame):
         """Allows for a safe shutdown from a systemd service
@@ -65,71 +191,358 @@ class LogicPi:
         WantedBy=multi-user.target
 
         """
-        # used to enable a safe shutdown from systemd
-        self.database.setting_write(self.name, 'Enabled', False)
+        # used to enable a safe shutdown from systemd, the database is not
+        # touched here as the signal may arrive in the middle of a query
+        self.request(self.CONTROL_STOP)
+
+    def request(self, message):
+        """Sends a control message to the supervisor loop, safe to call
+        from a signal handler or another thread.
+        """
+        try:
+            os.write(self._control_send, message)
+        except BlockingIOError:
+            pass  # The pipe is full, the loop already has messages to read
+
+    def control_message(self):
+        """Reads the messages waiting on the control pipe
+
+        Returns:
+            bool: False if a shutdown was requested
+        """
+        try:
+            messages = os.read(self._control, 512)
+        except BlockingIOError:
+            return True
+        return self.CONTROL_STOP not in messages
+
+    def start_db_writer(self):
+        self.db_writer = mp.Process(target=db_writer,
+                                    args=(self.write_queue, self.log_queue),
+                                    name='db_writer')
+        self.db_writer.start()
+        self.log.info(f'Database writer PID: {self.db_writer.pid}')
+
+    def db_writer_exit(self):
+        """Replaces the database writer after its process has died.
+
+        The writer may have died holding the queue's read lock or part way
+        through reading a write, so its queue is abandoned along with the
+        writes still on it. A new writer is started on a new queue and the
+        running programs are restarted with it, keeping their modes.
+        """
+        self.db_writer.join()
+        self.log.error(f'The database writer ({self.db_writer.pid}) has '
+                       f'died with an exit code {self.db_writer.exitcode}, '
+                       f'restarting it and the programs.')
+        self.database.data_write('Failed_Process', True)
+
+        programs = self.database.program_read_all() or dict()
+        running = list(self.processes)
+        self.halt_programs()
+
+        self.write_queue.close()
+        self.write_queue = mp.Queue(-1)
+        self.start_db_writer()
+        for program in self.programs:
+            program.set_write_queue(self.write_queue)
+        for unit in self.units.values():
+            if isinstance(unit, ScanCycle):
+                unit.write_queue = self.write_queue
+
+        for name in running:
+            for program in self.members[name]:
+                mode = programs.get(program, {}).get('Mode', OP_MODE.RUN)
+                self.database.program_write(program, mode=mode)
+            self.start_unit(name)
+            self.log.info(f'Starting program {name}, '
+                          f'PID: {self.processes[name].pid}')
+
+    def stop_db_writer(self):
+        if self.db_writer is None:
+            return
+        self.write_queue.put(None)
+        self.join_process(self.db_writer, timeout=10)
 
     def stoplog_listener(self):
         self.log_queue.put_nowait(None)
         self.log_listener.join()
 
-    def process_check(self, p_dict):
-        for program in self.database.program_list():
-            data = self.database.program_read(program)
-            
-            # The process won't be running if halted.
-            if data['Mode'] == OP_MODE.HALT:
+    def start_unit(self, name):
+        for program in self.members[name]:
+            self.heartbeats.heartbeat(program).reset()
+        process = mp.Process(target=run_unit,
+                             args=(self.units[name].operate, name,
+                                   self.scheduling.get(name, dict()),
+                                   self.log_queue),
+                             name=name)
+        # Objects that survive a collection in the parent are moved out of
+        # the collector's reach for the fork, the child's collections then
+        # do not write to the pages they share with the parent. The parent
+        # unfreezes so its own garbage is still collected.
+        gc.freeze()
+        try:
+            process.start()
+        finally:
+            gc.unfreeze()
+        self.processes[name] = process
+        self.started[name] = time.monotonic()
+        return process
+
+    def halted_programs(self):
+        """Returns the names of the programs in HALT"""
+        programs = self.database.program_read_all() or dict()
+        return {program for program, data in programs.items()
+                if data['Mode'] == OP_MODE.HALT}
+
+    def unit_ready(self, name, halted):
+        """True once every program in the unit that is not in halted has
+        completed a cycle since the unit's process was started. A unit with
+        every program halted has nothing to wait for.
+        """
+        active = [program for program in self.members[name]
+                  if program not in halted]
+        if not active:
+            return True
+        return (name in self.processes
+                and all(self.heartbeats.ready(program)
+                        for program in active))
+
+    def start_pending(self, halted):
+        """Starts the units waiting on the readiness barrier whose
+        providers are ready, or all of them once CONST.READY_TIMEOUT has
+        passed since LogicPi started.
+        """
+        timed_out = time.monotonic() > self.start_time + CONST.READY_TIMEOUT
+        for name in sorted(self.pending):
+            waiting = [provider for provider in self.depends[name]
+                       if not self.unit_ready(provider, halted)]
+            if waiting and not timed_out:
+                continue
+
+            if waiting:
+                missing = ', '.join(datapoint for provider in waiting
+                                    for datapoint in
+                                    self.depends[name][provider])
+                self.log.warning(f'Starting program {name} before '
+                                 f'{", ".join(waiting)} is ready, missing '
+                                 f'datapoints: {missing}')
+            self.pending.discard(name)
+            self.program_fails[name] = 0
+            self.start_unit(name)
+            self.log.info(f'Starting program {name}, '
+                          f'PID: {self.processes[name].pid}')
+
+    def report_startup(self, halted):
+        """Logs when each unit was started and ready, relative to LogicPi
+        starting.
+
+        Returns:
+            bool: True once every unit is ready and the timeline was logged
+        """
+        timed_out = time.monotonic() > self.start_time + CONST.READY_TIMEOUT
+        if not timed_out and (self.pending
+                              or not all(self.unit_ready(name, halted)
+                                         for name in self.units)):
+            return False
+
+        timeline = list()
+        for name in sorted(self.started, key=self.started.get):
+            entry = (f'{name} started '
+                     f'{self.started[name] - self.start_time:.2f}s')
+            ready = [self.heartbeats.ready(program)
+                     for program in self.members[name]
+                     if program not in halted]
+            if not ready:
+                entry += ' halted'
+            elif all(ready):
+                entry += f' ready {max(ready) - self.start_time:.2f}s'
+            else:
+                entry += ' not ready'
+            timeline.append(entry)
+        for name in sorted(self.pending):
+            timeline.append(f'{name} not started')
+        self.log.info(f'Startup timeline: {", ".join(timeline)}')
+        return True
+
+    def process_exit(self, name):
+        """Handles a unit's process that has exited, called as soon as its
+        sentinel is ready.
+        """
+        process = self.processes.pop(name)
+        process.join()
+
+        programs = self.database.program_read_all() or dict()
+        if all(programs.get(program, {}).get('Mode') == OP_MODE.HALT
+               for program in self.members[name]):
+            self.log.info(f'Program {name}, PID: {process.pid} has exited.')
+            return
+
+        self.log.error(f'The process ({process.pid}) for program {name} has '
+                       f'died with an exit code {process.exitcode}')
+        self.database.data_write('Failed_Process', True)
+        self.unit_failed(name, programs)
+
+    def process_check(self):
+        """Checks for failed or stalled programs, and starts programs that
+        have been taken out of HALT, with a single query.
+        """
+        programs = self.database.program_read_all()
+        if not programs:
+            return
+
+        for name, members in self.units_items(programs):
+            active = [(program, data) for program, data in members
+                      if data['Mode'] != OP_MODE.HALT]
+
+            if name in self.pending:
+                continue
+
+            process = self.processes.get(name)
+            if process is None:
+                # Halted, by request or after failing, and since restarted
+                if active:
+                    self.program_fails[name] = 0
+                    self.start_unit(name)
+                    self.log.info(f'Starting program {name}, '
+                                  f'PID: {self.processes[name].pid}')
                 continue
 
-            t_time = data['Period'] * CONST.PROCESS_STALL_CYCLES
-            stall_time = data['Last_Run'] + t_time
-
-            if self.program_fails[program] == -1:
-                pass
-
-            elif not p_dict[program].is_alive():
-                self.log.error(f'The process ({p_dict[program].pid})'
-                               f' for program {program} has died with an'
-                               f' exit code {p_dict[program].exitcode}')
-                self.database.data_write('Failed_Process', True)
-                p_dict[program].kill()
-                p_dict[program].join()
-
-            elif data['Status'] == OP_STATE.FAIL:
-                self.database.data_write('Failed_Process', True)
-                p_dict[program].kill()
-                p_dict[program].join()
-
-            elif time.time() > stall_time:
-                self.log.error(f'The process for program {program}, '
-                               f'PID: {p_dict[program].pid} '
-                               f'has stalled.')
-                self.database.data_write('Stalled_Process', True)
-                p_dict[program].kill()
-                p_dict[program].join()
+            for program, data in active:
+                if data['Status'] == OP_STATE.FAIL:
+                    self.log.error(f'Program {program}, PID: {process.pid} '
+                                   f'has failed.')
+                    self.database.data_write('Failed_Process', True)
+                    break
+
+                # A program is only checked for stalls once it is ready, or
+                # has had PROCESS_CHECK_DELAY to get there
+                if (not self.heartbeats.ready(program)
+                        and time.monotonic() < (self.started[name]
+                                                + CONST.PROCESS_CHECK_DELAY)):
+                    continue
+
+                _, last_beat = self.heartbeats.read(program)
+                t_time = (data['Period'] * self.heartbeats.stretch(program)
+                          * CONST.PROCESS_STALL_CYCLES)
+                if time.monotonic() > last_beat + t_time:
+                    self.log.error(f'The process for program {program}, '
+                                   f'PID: {process.pid} '
+                                   f'has stalled.')
+                    self.database.data_write('Stalled_Process', True)
+                    break
 
             else:
                 continue
 
-            if self.program_fails[program] >= 5:
+            del self.processes[name]
+            process.kill()
+            process.join()
+            self.unit_failed(name, programs)
+
+    def units_items(self, programs):
+        """Yields (unit name, [(program name, program data)]) for the units
+        whose programs are all in programs, from program_read_all().
+        """
+        for name, members in self.members.items():
+            if all(program in programs for program in members):
+                yield name, [(program, programs[program])
+                             for program in members]
+
+    def unit_failed(self, name, programs):
+        """Restarts a failed program or group, or halts it once it has
+        failed too many times. Group members that were halted stay halted.
+        """
+        if self.program_fails[name] >= 5:
+            for program in self.members[name]:
                 self.database.program_write(program, mode=OP_MODE.HALT)
                 self.database.program_write(program, status=OP_STATE.STOP)
-                self.log.error(f'Program: {program} has failed more than '
-                               '5 times and has been halted.')
-                self.program_fails[program] = -1
+            self.log.error(f'Program: {name} has failed more than '
+                           '5 times and has been halted.')
+            self.program_fails[name] = -1
+            return
+
+        self.program_fails[name] += 1
+        self.restarts[name] = time.monotonic()
+        for program in self.members[name]:
+            self.database.program_write(program, status=OP_STATE.STOP)
+            if programs.get(program, {}).get('Mode') != OP_MODE.HALT:
+                self.database.program_write(program, mode=OP_MODE.RUN)
+        process = self.start_unit(name)
+        self.log.warning(f'Restarting program {name}, PID: {process.pid}')
+
+    def report_restarts(self):
+        """Logs how long restarted units took to run their first cycle,
+        and the memory used by the new process.
+        """
+        for name, requested in list(self.restarts.items()):
+            process = self.processes.get(name)
+            if process is None:
+                del self.restarts[name]
                 continue
 
+            started = [self.heartbeats.started(program)
+                       for program in self.members[name]]
+            started = [value for value in started if value]
+            if not started:
+                continue
+
+            del self.restarts[name]
+            message = (f'Program {name} restarted in '
+                       f'{min(started) - requested:.3f}s')
+            stats = process_stats(process.pid)
+            if stats:
+                message += (f', RSS {stats["Rss"]} kB, '
+                            f'PSS {stats["Pss"]} kB')
+            self.log.info(message)
+
+    def report_memory(self):
+        """Logs the memory and context switch rate of each unit's process,
+        and the totals across them.
+        """
+        usage = list()
+        total_pss = 0
+        total_rate = 0
+        now = time.monotonic()
+        for name, process in self.processes.items():
+            stats = process_stats(process.pid)
+            if not stats:
+                continue
+
+            switches, last = self.switches.get(name, (0, None))
+            self.switches[name] = (stats['Switches'], now)
+            if last is None or stats['Switches'] < switches:
+                rate = ''
             else:
-                self.program_fails[program] += 1
-                del p_dict[program]
-                self.database.program_write(program, status=OP_STATE.STOP)
-                self.database.program_write(program, mode=OP_MODE.RUN)
-                for prg in self.programs:
-                    if prg.name == program:
-                        p_dict[program] = mp.Process(target=prg.operate)
-                        p_dict[program].start()
-                        self.log.warning(f'Restarting program {program}, '
-                                         f'PID: {p_dict[program].pid}')
-                        break
+                rate = (stats['Switches'] - switches) / (now - last)
+                total_rate += rate
+                rate = f' {rate:.1f}/s'
+            total_pss += stats['Pss']
+            usage.append(f'{name} {stats["Rss"]}/{stats["Pss"]}{rate}')
+
+        if usage:
+            self.log.info(f'Program memory RSS/PSS kB and context switches: '
+                          f'{", ".join(usage)}. Total PSS {total_pss} kB, '
+                          f'{total_rate:.1f} switches/s')
+
+    def report_lateness(self):
+        """Logs how late each program's cycles started against their due
+        time since the last report, the jitter seen by the program.
+        """
+        usage = list()
+        for program in self.programs:
+            count, total, late_max = self.heartbeats.lateness(program.name)
+            last_count, last_total = self.lateness.get(program.name, (0, 0))
+            self.lateness[program.name] = (count, total)
+            if count <= last_count:
+                continue
+            average = (total - last_total) / (count - last_count)
+            usage.append(f'{program.name} {average * 1000:.1f}/'
+                         f'{late_max * 1000:.1f}')
+        self.heartbeats.lateness_reported()
+        if usage:
+            self.log.info(f'Program cycle lateness avg/max ms: '
+                          f'{", ".join(usage)}')
 
     def join_process(self, process, timeout=5):
         process.join(timeout=timeout)
@@ -139,51 +552,117 @@ class LogicPi:
             process.kill()
             process.join()
 
+    def halt_programs(self, timeout=CONST.PROCESS_HALT_TIME):
+        """Halts every program at once and waits for them together, any
+        still running once timeout seconds have passed are killed.
+        """
+        for name, process in self.processes.items():
+            for program in self.members[name]:
+                self.database.program_write(program, mode=OP_MODE.HALT)
+            self.log.info(f'Waiting on program: {name}, '
+                          f'PID: {process.pid}, to exit.')
+
+        deadline = time.monotonic() + timeout
+        sentinels = {process.sentinel: name
+                     for name, process in self.processes.items()}
+        while sentinels:
+            ready = wait(list(sentinels),
+                         max(0, deadline - time.monotonic()))
+            if not ready:
+                break
+            for sentinel in ready:
+                self.processes.pop(sentinels.pop(sentinel)).join()
+
+        for name, process in self.processes.items():
+            self.log.warning(f'Program {name}, PID {process.pid} did not '
+                             'exit. Killing program.')
+            process.kill()
+            process.join()
+        self.processes.clear()
+
     def main(self):
-        p_dict = dict()
-        p_check_start = time.time() + CONST.PROCESS_CHECK_DELAY
+        self.processes = dict()
+        gc.collect()
 
         for program in self.programs:
             program.mode = OP_MODE.RUN
-            self.program_fails[program.name] = 0
-            p_dict[program.name] = mp.Process(target=program.operate)
-            p_dict[program.name].start()
-            self.log.info(f'Starting program {program.name}, '
-                          f'PID: {p_dict[program.name].pid}')
 
-        enabled = True
-        while enabled:
-            time.sleep(0.25)
-            enabled = self.database.setting_read_single(self.name, 'Enabled')
-            if (p_check_start < time.time()) or not enabled:
-                break
+        self.pending = set(self.units)
+        self.start_pending(set())
+        starting = True
 
-        while enabled:
-            process_check_time = time.time() + CONST.PROCESS_CHECK_TIME
-            while True:
-                time.sleep(0.25)
-                enabled = self.database.setting_read_single(self.name,
-                                                            'Enabled')
-                if (process_check_time < time.time()) or not enabled:
-                    break
+        now = time.monotonic()
+        check_time = now + CONST.PROCESS_CHECK_TIME
+        enabled_time = now + CONST.PROCESS_ENABLED_TIME
+        memory_time = check_time
+        lateness_time = check_time
+        governor_time = check_time
+        settings_version = self.database.settings_version()
 
-            if enabled:
-                self.process_check(p_dict)
+        enabled = True
+        while enabled:
+            # Sleeps until a process exits, a control message arrives or
+            # the next check is due
+            sentinels = {process.sentinel: name
+                         for name, process in self.processes.items()}
+            if self.db_writer is not None:
+                sentinels[self.db_writer.sentinel] = None
+            next_time = min(check_time, enabled_time)
+            if starting:
+                next_time = min(next_time, now + CONST.READY_POLL_TIME)
+            timeout = max(0, next_time - time.monotonic())
+            ready = wait(list(sentinels) + [self._control], timeout)
+
+            for item in ready:
+                if item == self._control:
+                    enabled = self.control_message()
+                elif sentinels[item] is None:
+                    self.db_writer_exit()
+                else:
+                    self.process_exit(sentinels[item])
+
+            now = time.monotonic()
+            if enabled and starting:
+                halted = self.halted_programs()
+                self.start_pending(halted)
+                starting = not self.report_startup(halted)
+
+            # The Enabled setting is only read when a setting has changed
+            if enabled and now >= enabled_time:
+                version = self.database.settings_version()
+                if version != settings_version:
+                    settings_version = version
+                    enabled = self.database.setting_read_single(self.name,
+                                                                'Enabled')
+                enabled_time = now + CONST.PROCESS_ENABLED_TIME
+
+            if enabled and now >= check_time:
+                self.process_check()
+                self.maintenance.run()
+                check_time = time.monotonic() + CONST.PROCESS_CHECK_TIME
+
+            if self.restarts:
+                self.report_restarts()
+
+            if enabled and now >= memory_time:
+                self.report_memory()
+                memory_time = now + CONST.PROCESS_MEMORY_TIME
+
+            if enabled and now >= governor_time:
+                self.governor.update()
+                governor_time = now + CONST.GOVERNOR_TIME
+
+            if enabled and now >= lateness_time:
+                self.report_lateness()
+                lateness_time = now + CONST.PROCESS_LATENESS_TIME
 
         self.log.warning('Shutdown requested.')
-        for program in self.database.program_list():
-            self.database.program_write(program, mode=OP_MODE.HALT)
-            self.log.info(f'Waiting on program: {program}, '
-                          f'PID: {p_dict[program].pid}, to exit.')
-            self.join_process(p_dict[program])
-            del p_dict[program]
-
-        if p_dict:
-            for program, process in p_dict.items():
-                self.log.warning(f'An orphand process was found: {program}')
-                process.kill()
-                self.join_process(process)
+        self.database.setting_write(self.name, 'Enabled', False)
+        self.halt_programs()
 
+        self.stop_db_writer()
         self.stoplog_listener()
         self.log.info('System shutdown.')
         self.database.close_connection()
+        os.close(self._control)
+        os.close(self._control_send)
@@ -0,0 +1,233 @@
+import queue
+import smtplib
+import threading
+import time
+
+from email.message import EmailMessage
+
+from app.constants import CONST
+
+
+class AlarmNotifier:
+    """Sends alarm notifications by email from a single worker thread.
+
+    Events are put on a bounded queue and never block the caller. The
+    worker gathers events for CONST.NOTIFY_WINDOW seconds and sends them as
+    one message, an alarm that changes state several times within the
+    window is reported once with the number of changes. No more than
+    CONST.NOTIFY_MAX_PER_HOUR messages are sent, events beyond that are
+    held and sent together once the limit allows. The SMTP connection is
+    kept open between messages and re-established when it has dropped.
+
+    The worker thread starts on the first notify() so the notifier can be
+    created before a program process forks.
+    """
+
+    def __init__(self, log):
+        self.log = log
+        self._queue = queue.Queue(maxsize=CONST.NOTIFY_QUEUE_SIZE)
+        self._thread = None
+        self._smtp = None
+        self._config = None
+        self._config_lock = threading.Lock()
+        self._reset = False
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._sent = list()  # Send times within the last hour
+
+    def configure(self, server, port, username, password, receiver,
+                  use_ssl=True):
+        """Sets the SMTP details, a change closes the current connection"""
+        config = (str(server), int(port), str(username), str(password),
+                  str(receiver), bool(use_ssl))
+        with self._config_lock:
+            if config != self._config:
+                self._config = config
+                self._reset = True
+
+    def notify(self, name, state, description):
+        """Queues an alarm event
+
+        Args:
+            name (str): Alarm name
+            state (str): For example 'ACTIVE' or 'CLEAR'
+            description (str): Alarm description
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._worker,
+                                            name='AlarmNotifier',
+                                            daemon=True)
+            self._thread.start()
+
+        try:
+            self._queue.put_nowait((name, state, description))
+        except queue.Full:
+            with self._dropped_lock:
+                self._dropped += 1
+
+    def stop(self, timeout=None):
+        """Sends anything pending and stops the worker thread
+
+        Args:
+            timeout (float, optional): Seconds to wait for the worker.
+            Defaults to long enough for both send attempts to time out.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return
+        if timeout is None:
+            timeout = 2 * CONST.NOTIFY_SMTP_TIMEOUT + 5
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def _worker(self):
+        pending = dict()  # {name: [state, changes, description]}
+        order = list()
+        running = True
+
+        while running or pending:
+            if pending:
+                timeout = CONST.NOTIFY_WINDOW
+            else:
+                timeout = CONST.NOTIFY_IDLE_TIMEOUT
+            try:
+                event = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                if not pending:
+                    self._disconnect()
+                    continue
+                event = False
+
+            window_end = time.monotonic() + CONST.NOTIFY_WINDOW
+            while event is not False:
+                if event is None:
+                    running = False
+                    break
+                name, state, description = event
+                if name in pending:
+                    pending[name][0] = state
+                    pending[name][1] += 1
+                else:
+                    pending[name] = [state, 1, description]
+                    order.append(name)
+
+                timeout = window_end - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    event = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+
+            if not pending:
+                continue
+
+            if running and not self._rate_ok():
+                continue  # Hold the events and keep collecting
+
+            message = self._compose(pending, order)
+            if self._send(message) or not running:
+                pending = dict()
+                order = list()
+            elif running:
+                # Keep the events for the next attempt
+                time.sleep(CONST.NOTIFY_WINDOW)
+
+        self._disconnect()
+
+    def _rate_ok(self):
+        hour_ago = time.monotonic() - 3600
+        self._sent = [t for t in self._sent if t > hour_ago]
+        return len(self._sent) < CONST.NOTIFY_MAX_PER_HOUR
+
+    def _compose(self, pending, order):
+        parts = list()
+        for name in order:
+            state, changes, description = pending[name]
+            text = (f'***** ALARM {state} *****\n'
+                    f'Name: {name}\n'
+                    f'Desc: "{description}"')
+            if changes > 1:
+                text += f'\nChanged state {changes} times since last report'
+            parts.append(text)
+
+        with self._dropped_lock:
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            parts.append(f'{dropped} further alarm events were dropped.')
+
+        subject = (f'LogicPi: {len(order)} alarm event'
+                   f'{"s" if len(order) > 1 else ""}')
+        return subject, '\n\n'.join(parts)
+
+    def _connect(self):
+        with self._config_lock:
+            config = self._config
+            self._reset = False
+        if config is None:
+            return None
+
+        server, port, username, password, _, use_ssl = config
+        if use_ssl:
+            smtp = smtplib.SMTP_SSL(server, port,
+                                    timeout=CONST.NOTIFY_SMTP_TIMEOUT)
+        else:
+            smtp = smtplib.SMTP(server, port,
+                                timeout=CONST.NOTIFY_SMTP_TIMEOUT)
+        if username and password:
+            smtp.login(username, password)
+        return smtp
+
+    def _disconnect(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._smtp = None
+
+    def _connection(self):
+        """Returns a working connection, reconnecting if required"""
+        if self._reset:
+            self._disconnect()
+
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._disconnect()
+
+        self._smtp = self._connect()
+        return self._smtp
+
+    def _send(self, message):
+        subject, content = message
+        for attempt in (1, 2):
+            try:
+                smtp = self._connection()
+                if smtp is None:
+                    self.log.warning('Alarm notification not sent, messaging '
+                                     'is not configured.')
+                    return True  # Nothing can be done, discard
+
+                _, _, username, _, receiver, _ = self._config
+                email = EmailMessage()
+                email['From'] = username
+                email['To'] = receiver
+                email['Subject'] = subject
+                email.set_content(content)
+                smtp.send_message(email)
+                self._sent.append(time.monotonic())
+                return True
+
+            except (smtplib.SMTPException, OSError) as e:
+                self._disconnect()
+                if attempt == 2:
+                    self.log.warning(f'Alarm notification could not be '
+                                     f'sent. {e}')
+        return False
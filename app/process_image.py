@@ -0,0 +1,83 @@
+import time
+
+from app.constants import CONST
+
+
+class ProcessImage:
+    """Snapshot of the datapoints used by the programs in a scan cycle.
+
+    latch() reads every datapoint in one query at the start of a scan, the
+    programs then read from and write to the snapshot, so every program in
+    the scan sees the same inputs and its own and earlier programs'
+    outputs. flush() writes the outputs in one transaction at the end of
+    the scan.
+
+    Overridden datapoints are latched with their lock holders and writes
+    to them are refused, as data_write() refuses them.
+
+    With the database writer enabled flush() only queues the outputs, so
+    they are laid over the latched values until the database shows them,
+    or CONST.SCAN_PENDING_TIME has passed, and a scan does not see its
+    outputs revert to the values from before the writer's commit.
+    """
+
+    def __init__(self, database):
+        self._database = database
+        self.values = dict()
+        self.locks = dict()
+        self._outputs = dict()
+        # {datapoint: (value, time.monotonic() queued)}
+        self._pending = dict()
+
+    def latch(self):
+        """Reads the inputs for a new scan, the previous snapshot is kept if
+        the read fails.
+        """
+        data = self._database.data_read_with_locks()
+        if data:
+            self.values, self.locks = data
+
+        expired = time.monotonic() - CONST.SCAN_PENDING_TIME
+        for datapoint, (value, queued) in list(self._pending.items()):
+            if (self.values.get(datapoint) == value or queued < expired
+                    or datapoint in self.locks):
+                del self._pending[datapoint]
+            else:
+                self.values[datapoint] = value
+
+    def read(self, datapoint):
+        return self.values.get(datapoint)
+
+    def read_many(self, datapoints):
+        if isinstance(datapoints, str):
+            datapoints = (datapoints,)
+        return {datapoint: self.values[datapoint]
+                for datapoint in datapoints if datapoint in self.values}
+
+    def search(self, search):
+        """Matches data_search(), a case insensitive substring search"""
+        search = str(search).lower()
+        return {datapoint: value for datapoint, value in self.values.items()
+                if search in datapoint.lower()}
+
+    def write(self, datapoint, value):
+        if datapoint is None or value is None:
+            return False
+        if datapoint in self.locks:
+            return False
+        self.values[datapoint] = value
+        self._outputs[datapoint] = value
+        return True
+
+    def flush(self):
+        """Writes the scan's outputs, returns the number of datapoints"""
+        if not self._outputs:
+            return 0
+        outputs = self._outputs
+        self._outputs = dict()
+        self._database.data_write_many(outputs)
+        if self._database.queued_writes:
+            queued = time.monotonic()
+            for datapoint, value in outputs.items():
+                self._pending[datapoint] = (value, queued)
+        return len(outputs)
@@ -14,6 +14,7 @@ from app.database import AppDatabase
 from app.database import OP_MODE, OP_STATE, TYPES
 from app.syslog import get_worker_log, get_local_log
 from app.constants import CONST
+from app.scheduling import parse_settings
 
 
 class Program:
@@ -35,14 +36,16 @@ class Program:
     OP_MODES = OP_MODE
     OP_STATES = OP_STATE
     D_TYPES = TYPES
+    # Used when the config file has no CRITICALITY, see criticality
+    CRITICALITY = 'NORMAL'
 
-    def __init__(self, log_queue):
+    def __init__(self, log_queue, write_queue=None):
         """Please see help(Program) for more info.
         Do not override this method, user inititialization should go in
         'program_init()'
         """
         self.name = self.__class__.__name__.lower()
-        self._database = AppDatabase()
+        self._database = AppDatabase(write_queue)
         self.log = get_worker_log(self.name, log_queue)
         self.settings = dict()
         
@@ -50,6 +53,17 @@ class Program:
         self.call_stop_every_cycle = True
         self.call_pause_every_cycle = True
 
+        # Set by LogicPi, see app.heartbeat
+        self.heartbeat = None
+        # Set while running in a scan cycle, see app.scan_cycle
+        self.image = None
+        # Datapoints the program writes and reads, set in program_init().
+        # LogicPi starts a program once the programs providing its
+        # required datapoints have completed a cycle.
+        self.provides = list()
+        self.requires = list()
+        self._last_run_time = 0
+
         self.config = self._load_config()        
 
         self._database.program_write(self.name,
@@ -67,6 +81,10 @@ class Program:
         self.last_run = None
         self.settings_to_db()
 
+    def set_write_queue(self, write_queue):
+        """Replaces the database writer's queue, for the next start"""
+        self._database.set_write_queue(write_queue)
+
     def settings_to_db(self, overwrite=False):
         if not isinstance(self.settings, dict):
             self.log.warning('Program settings information is not a dict.')
@@ -191,6 +209,63 @@ class Program:
     def last_run(self, time):
         self._database.program_write(self.name, last_run=time)
 
+    @property
+    def group(self):
+        """Name of the program group from the GROUP key in the [PROCESS]
+        section of the config file, None if the program runs in its own
+        process. See app.program_group.
+        """
+        if self.config is None or 'PROCESS' not in self.config:
+            return None
+        return self.config['PROCESS'].get('GROUP') or None
+
+    @property
+    def scan_order(self):
+        """Position in the scan cycle from the SCAN_ORDER key in the
+        [PROCESS] section of the config file, None if the program is not
+        part of the scan cycle. See app.scan_cycle.
+        """
+        if self.config is None or 'PROCESS' not in self.config:
+            return None
+        try:
+            return self.config['PROCESS'].getint('SCAN_ORDER')
+        except ValueError:
+            self.log.warning('SCAN_ORDER must be an integer.')
+            return None
+
+    @property
+    def criticality(self):
+        """HIGH, NORMAL or LOW from the CRITICALITY key in the [PROCESS]
+        section of the config file, the governor stretches the periods of
+        LOW programs first and never those of HIGH programs. Defaults to
+        the class's CRITICALITY.
+        """
+        if self.config is None or 'PROCESS' not in self.config:
+            return self.CRITICALITY
+        criticality = self.config['PROCESS'].get('CRITICALITY',
+                                                 self.CRITICALITY)
+        criticality = criticality.strip().upper()
+        if criticality not in ('HIGH', 'NORMAL', 'LOW'):
+            self.log.warning(f'Unknown CRITICALITY {criticality}, '
+                             f'{self.CRITICALITY} is used.')
+            return self.CRITICALITY
+        return criticality
+
+    @property
+    def scheduling(self):
+        """Process scheduling settings from the [PROCESS] section of the
+        config file, applied by LogicPi when the process is started. See
+        app.scheduling.parse_settings().
+        """
+        if self.config is None or 'PROCESS' not in self.config:
+            return dict()
+        try:
+            return parse_settings(self.config['PROCESS'])
+        except ValueError as e:
+            self.log.warning(f'Invalid scheduling settings, they are '
+                             f'ignored. {e}')
+            return dict()
+
     @property
     def period(self):
         return self._database.program_read(self.name)['Period']
@@ -205,15 +280,21 @@ class Program:
                              f'({value}).')
 
     def has_datapoint(self, datapoint):
+        if self.image is not None:
+            return datapoint in self.image.values
         if self._database.data_read(datapoint):
             return True
         else:
             return False
 
     def write_datapoint(self, datapoint, value):
+        if self.image is not None:
+            return self.image.write(datapoint, value)
         return self._database.data_write(datapoint, value)
 
     def read_datapoint(self, datapoint):
+        if self.image is not None:
+            return self.image.read(datapoint)
         t_val = self._database.data_read(datapoint)
         if not t_val:
             return None
@@ -221,12 +302,42 @@ class Program:
             return t_val[datapoint]
 
     def read_datapoints(self, datapoints):
+        if self.image is not None:
+            return self.image.read_many(datapoints)
         return self._database.data_read(datapoints)
 
     def search_datapoint(self, search):
+        if self.image is not None:
+            return self.image.search(search)
         return self._database.data_search(search)
 
     def operate(self):
+        """Runs the program in its own process until it is halted"""
+        self.operate_start()
+
+        while self.running:
+            wake_time = self.operate_cycle()
+            # wake and check status every second in-case program is disabled
+            # during a sleep cycle
+            while True:
+                if not self.running:
+                    break
+
+                diff = wake_time - time.monotonic()
+                if diff <= 0:
+                    break
+                if 0 < diff < 1:
+                    time.sleep(diff)
+                    break
+                else:
+                    time.sleep(1)
+
+        self.operate_end()
+
+    def operate_start(self):
+        """Prepares the state machine, operate_cycle() can then be called
+        until self.running is False, followed by operate_end().
+        """
         def set_run():
             self.status = OP_STATE.RUN
             self.log.info('Program running.')
@@ -250,6 +361,14 @@ class Program:
 
             period = self.period
 
+            if self.heartbeat is not None:
+                # Supervised by LogicPi, its governor stretches the
+                # periods of overrunning programs and restores them, see
+                # app.governor
+                if (t2 - t1) > period * self.heartbeat.stretch:
+                    self.heartbeat.overrun()
+                return
+
             if (t2 - t1) > period:
                 period = math.ceil((t2-t1) * 4.25) / 4
                 self.log.warning(f'Program did not complete within its '
@@ -291,68 +410,120 @@ class Program:
                                                     halt_loop],
                                     OP_STATE.FAIL: [set_stop,
                                                     halt_loop]}}
+        self._mode_dict = MODE_DICT
         self.running = True
+        self._due = None
+        self._lock_report_time = (time.monotonic()
+                                  + CONST.DB_LOCK_REPORT_TIME)
 
-        while self.running:
-            loop_mode = self.mode  # Pulled up here to minimize db access
-            loop_status = self.status
-            self.last_run = time.time()
-            for item in MODE_DICT[loop_mode][loop_status]:
-                if item is not None:
-                    try:
-                        item()
-                    except Exception:
-                        self.log.exception(f'Failed to run {item.__name__} '
-                                           'method.')
-                        self.status = self.OP_STATES.FAIL
-
-            wake_time = time.monotonic() + self.period
-            # wake and check status every second in-case program is disabled
-            # during a sleep cycle
-            while True:
-                if not self.running:
-                    break
-
-                diff = wake_time - time.monotonic()
-                if diff <= 0:
-                    break
-                if 0 < diff < 1:
-                    time.sleep(diff)
-                    break
-                else:
-                    time.sleep(1)
+    def operate_cycle(self):
+        """Runs one cycle of the state machine
 
+        Returns:
+            float: The time.monotonic() the next cycle is due
+        """
+        loop_mode = self.mode  # Pulled up here to minimize db access
+        loop_status = self.status
+        self._beat()
+        failed = loop_status == OP_STATE.FAIL
+        for item in self._mode_dict[loop_mode][loop_status]:
+            if item is not None:
+                try:
+                    item()
+                except Exception:
+                    self.log.exception(f'Failed to run {item.__name__} '
+                                       'method.')
+                    self.status = self.OP_STATES.FAIL
+                    failed = True
+
+        if not failed and self.heartbeat is not None:
+            self.heartbeat.set_ready()
+
+        if time.monotonic() > self._lock_report_time:
+            self._report_lock_waits()
+            self._lock_report_time = (time.monotonic()
+                                      + CONST.DB_LOCK_REPORT_TIME)
+
+        period = self.period
+        if self.heartbeat is not None:
+            period *= self.heartbeat.stretch
+        self._due = time.monotonic() + period
+        return self._due
+
+    def operate_end(self):
+        """Called once the state machine has halted"""
         self._program_halt()
+        self._report_lock_waits()
         self._database.close_connection()
 
+    def _beat(self):
+        """Marks the start of a cycle. Stall detection uses the shared
+        memory heartbeat, Last_Run is only written every
+        CONST.LAST_RUN_PERSIST_TIME for display.
+        """
+        if self.heartbeat is not None:
+            late = None
+            if self._due is not None:
+                late = max(0.0, time.monotonic() - self._due)
+            self.heartbeat.beat(late)
+            if time.monotonic() < self._last_run_time:
+                return
+            self._last_run_time = (time.monotonic()
+                                   + CONST.LAST_RUN_PERSIST_TIME)
+        self.last_run = time.time()
+
+    def _report_lock_waits(self):
+        """Logs the time spent waiting on database locks since the last
+        report, nothing is logged if the program never had to wait.
+        """
+        stats = self._database.lock_wait_stats(reset=True)
+        if not stats:
+            return
+
+        count = sum(item['count'] for item in stats.values())
+        wait = sum(item['wait'] for item in stats.values())
+        lost = sum(item['lost'] for item in stats.values())
+        detail = ', '.join(f'{caller}: {item["wait"]:.3f}s'
+                           for caller, item in stats.items())
+        if lost:
+            self.log.warning(f'{lost} database writes lost to locks, '
+                             f'{count} delayed for {wait:.3f}s ({detail}).')
+        else:
+            self.log.info(f'{count} database writes delayed by locks for '
+                          f'{wait:.3f}s ({detail}).')
+
     def _program_init(self):
         self.program_init()
 
+    def _call(self, hook):
+        """Calls a program_* hook, see AsyncProgram"""
+        return hook()
+
     def _program_start(self):
         if self.reload_config_on_restart:
             self.config = self._load_config()
-        self.program_start()
+        self._call(self.program_start)
 
     def _program_run(self):
-        self.program_run()
+        self._call(self.program_run)
 
     def _program_pause(self):
         if self.status != self.OP_MODES.PAUSE:
-            self.program_pause()
+            self._call(self.program_pause)
         elif self.call_pause_every_cycle:
-            self.program_pause()
+            self._call(self.program_pause)
 
     def _program_stop(self):
         if self.status != self.OP_MODES.STOP:
-            self.program_stop()
+            self._call(self.program_stop)
         elif self.call_stop_every_cycle:
-            self.program_stop()
+            self._call(self.program_stop)
 
     def _program_fail(self):
-        self.program_fail()
+        self._call(self.program_fail)
 
     def _program_halt(self):
-        self.program_halt()
+        self._call(self.program_halt)
 
     def program_init(self):
         """ Called once when the program is initialized """
@@ -383,7 +554,7 @@ class Program:
         pass
 
 
-def load_programs(program_dir, log_queue):
+def load_programs(program_dir, log_queue, write_queue=None):
     """Read the programs folder for modules.
 
     Modules must contain a class definition that
@@ -414,14 +585,16 @@ def load_programs(program_dir, log_queue):
             program_module = importlib.import_module(filename)
             members = inspect.getmembers(program_module, inspect.isclass)
             for (class_name, class_obj) in members:
-                # Only add classes that are a sub class of Program,
-                # but NOT Program itself, and not a duplicate class name.
-                if issubclass(class_obj, Program) \
-                        & (class_obj is not Program):
+                # Only add classes defined in the module that are a sub
+                # class of Program, not imported base classes such as
+                # Program or AsyncProgram, and not a duplicate class name.
+                if (class_obj.__module__ == program_module.__name__
+                        and issubclass(class_obj, Program)):
                     duplicate = _is_duplicate(program_list, class_name)
                     if not duplicate:
                         log.info(f'Found program: {class_name}')
-                        program_list.append(class_obj(log_queue))
+                        program_list.append(class_obj(log_queue,
+                                                      write_queue))
                     else:
                         log.warning('Duplicate program '
                                     f'"{duplicate.__module__}.{class_name}" '
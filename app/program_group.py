@@ -0,0 +1,75 @@
+import heapq
+import time
+
+from app.constants import CONST
+from app.database import OP_MODE
+from app.syslog import get_worker_log
+
+
+class ProgramGroup:
+    """Runs several programs in one process, scheduled cooperatively.
+
+    Programs join a group with a GROUP key in the [PROCESS] section of their
+    config file. Each keeps its own period and state machine, the group
+    runs whichever program is due next from a deadline heap, so a program
+    that blocks delays the whole group. LogicPi supervises the group as a
+    single process, a failure or stall of any member restarts all of them.
+
+    A halted member is checked every CONST.GROUP_HALT_CHECK_TIME and
+    started again if it leaves HALT, the process exits once every member
+    is halted.
+    """
+
+    def __init__(self, group, programs, log_queue):
+        self.name = f'group_{group}'
+        self.programs = programs
+        self.log_queue = log_queue
+
+    def operate(self):
+        self.log = get_worker_log(self.name, self.log_queue)
+        self.log.info(f'Running programs: '
+                      f'{", ".join(p.name for p in self.programs)}')
+
+        # (due time, index, program), the index breaks ties between
+        # programs due at the same time
+        heap = list()
+        halted = dict()
+        for index, program in enumerate(self.programs):
+            program.operate_start()
+            heap.append((time.monotonic(), index, program))
+        heapq.heapify(heap)
+        halt_check = time.monotonic() + CONST.GROUP_HALT_CHECK_TIME
+
+        while heap:
+            due, index, program = heap[0]
+            now = time.monotonic()
+            if due > now:
+                if not halted:
+                    time.sleep(due - now)
+                    continue
+                time.sleep(max(0, min(due, halt_check) - now))
+                if time.monotonic() >= halt_check:
+                    self._resume(halted, heap)
+                    halt_check = (time.monotonic()
+                                  + CONST.GROUP_HALT_CHECK_TIME)
+                continue
+
+            heapq.heappop(heap)
+            due = program.operate_cycle()
+            if program.running:
+                heapq.heappush(heap, (due, index, program))
+            else:
+                program.operate_end()
+                halted[index] = program
+
+    def _resume(self, halted, heap):
+        """Starts halted members again once they have left HALT"""
+        for index, program in list(halted.items()):
+            # A halted member does not beat, keep it from looking stalled
+            # between leaving HALT and being resumed
+            if program.heartbeat is not None:
+                program.heartbeat.reset()
+            if program.mode != OP_MODE.HALT:
+                del halted[index]
+                program.operate_start()
+                heapq.heappush(heap, (time.monotonic(), index, program))
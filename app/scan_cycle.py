@@ -0,0 +1,128 @@
+import time
+
+from app.constants import CONST
+from app.database import AppDatabase, OP_MODE
+from app.process_image import ProcessImage
+from app.syslog import get_worker_log
+
+
+class ScanCycle:
+    """Runs programs PLC style, in order, against a process image.
+
+    Programs join the scan cycle with a SCAN_ORDER key in the [PROCESS]
+    section of their config file, lowest first. Every CONST.SCAN_PERIOD
+    the datapoints are latched into a ProcessImage, each program that is
+    due runs one cycle against it in order, and the outputs are flushed in
+    one transaction. Programs keep their own period, one longer than the
+    scan period only runs on the scans where it is due.
+
+    The scan time, and the part of it spent flushing the outputs, are
+    logged every CONST.SCAN_REPORT_TIME. With the database writer enabled
+    the outputs are queued to it, so its commit is not included.
+
+    LogicPi supervises the scan cycle like a program group, see
+    app.program_group.
+    """
+
+    def __init__(self, programs, log_queue, write_queue=None):
+        self.name = 'scan_cycle'
+        self.programs = sorted(programs, key=lambda p: p.scan_order)
+        self.log_queue = log_queue
+        self.write_queue = write_queue
+
+    def operate(self):
+        self.log = get_worker_log(self.name, self.log_queue)
+        self.log.info(f'Scan order: '
+                      f'{", ".join(p.name for p in self.programs)}')
+
+        database = AppDatabase(self.write_queue)
+        image = ProcessImage(database)
+        due = dict()
+        running = list()
+        halted = list()
+        for program in self.programs:
+            program.image = image
+            program.operate_start()
+            due[program.name] = 0
+            running.append(program)
+
+        self._reset_stats()
+        report_time = time.monotonic() + CONST.SCAN_REPORT_TIME
+        halt_check = time.monotonic() + CONST.GROUP_HALT_CHECK_TIME
+
+        while running:
+            scan_start = time.monotonic()
+            image.latch()
+            for program in list(running):
+                if due[program.name] > scan_start:
+                    continue
+                due[program.name] = program.operate_cycle()
+                if not program.running:
+                    program.operate_end()
+                    running.remove(program)
+                    halted.append(program)
+            flush_start = time.monotonic()
+            image.flush()
+
+            scan_end = time.monotonic()
+            self._record(scan_end - scan_start, scan_end - flush_start)
+
+            if scan_end >= report_time:
+                self._report()
+                report_time = scan_end + CONST.SCAN_REPORT_TIME
+
+            if halted and scan_end >= halt_check:
+                for program in self._resume(halted):
+                    due[program.name] = 0
+                    running.append(program)
+                running.sort(key=lambda p: p.scan_order)
+                halt_check = scan_end + CONST.GROUP_HALT_CHECK_TIME
+
+            wait = scan_start + CONST.SCAN_PERIOD - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            else:
+                self._overruns += 1
+
+        database.close_connection()
+
+    def _resume(self, halted):
+        """Returns the halted programs that have left HALT, started again"""
+        resumed = list()
+        for program in list(halted):
+            # A halted member does not beat, keep it from looking stalled
+            # between leaving HALT and being resumed
+            if program.heartbeat is not None:
+                program.heartbeat.reset()
+            if program.mode != OP_MODE.HALT:
+                halted.remove(program)
+                program.operate_start()
+                resumed.append(program)
+        return resumed
+
+    def _reset_stats(self):
+        self._scans = 0
+        self._overruns = 0
+        self._scan_total = 0.0
+        self._scan_max = 0.0
+        self._flush_total = 0.0
+        self._flush_max = 0.0
+
+    def _record(self, scan_time, flush_time):
+        self._scans += 1
+        self._scan_total += scan_time
+        self._scan_max = max(self._scan_max, scan_time)
+        self._flush_total += flush_time
+        self._flush_max = max(self._flush_max, flush_time)
+
+    def _report(self):
+        if not self._scans:
+            return
+        self.log.info(
+            f'{self._scans} scans, scan time avg '
+            f'{self._scan_total / self._scans * 1000:.1f}ms max '
+            f'{self._scan_max * 1000:.1f}ms, output flush avg '
+            f'{self._flush_total / self._scans * 1000:.1f}ms max '
+            f'{self._flush_max * 1000:.1f}ms, '
+            f'{self._overruns} overruns.')
+        self._reset_stats()
@@ -0,0 +1,140 @@
+import os
+import subprocess
+
+from app.syslog import get_worker_log
+
+
+POLICIES = {'OTHER': os.SCHED_OTHER,
+            'BATCH': os.SCHED_BATCH,
+            'IDLE': os.SCHED_IDLE,
+            'FIFO': os.SCHED_FIFO,
+            'RR': os.SCHED_RR}
+
+IO_CLASSES = {'RT': 1, 'BE': 2, 'IDLE': 3}
+
+
+def parse_settings(section):
+    """Reads the scheduling keys from a program's [PROCESS] config section
+
+        NICE = -5
+        SCHED_POLICY = FIFO      ; OTHER, BATCH, IDLE, FIFO or RR
+        SCHED_PRIORITY = 20      ; 1 to 99, FIFO and RR only
+        CPU_AFFINITY = 2,3       ; or a range, 2-3
+        IO_CLASS = BE            ; RT, BE or IDLE
+        IO_PRIORITY = 0          ; 0 (highest) to 7, RT and BE only
+
+    Returns:
+        dict: The keys that are set, see apply_settings()
+
+    Raises:
+        ValueError: If a value can not be parsed
+    """
+    settings = dict()
+    if section is None:
+        return settings
+
+    if 'NICE' in section:
+        settings['nice'] = section.getint('NICE')
+
+    if 'SCHED_POLICY' in section:
+        policy = section['SCHED_POLICY'].strip().upper()
+        if policy not in POLICIES:
+            raise ValueError(f'Unknown SCHED_POLICY {policy}')
+        priority = section.getint('SCHED_PRIORITY', 0)
+        if policy in ('FIFO', 'RR'):
+            if not 1 <= priority <= 99:
+                raise ValueError(f'SCHED_PRIORITY must be 1 to 99 for '
+                                 f'{policy}, not {priority}')
+        elif priority != 0:
+            raise ValueError(f'SCHED_PRIORITY must be 0 for {policy}')
+        settings['policy'] = policy
+        settings['priority'] = priority
+
+    if 'CPU_AFFINITY' in section:
+        settings['cpus'] = parse_cpus(section['CPU_AFFINITY'])
+
+    if 'IO_CLASS' in section:
+        io_class = section['IO_CLASS'].strip().upper()
+        if io_class not in IO_CLASSES:
+            raise ValueError(f'Unknown IO_CLASS {io_class}')
+        settings['io_class'] = io_class
+        settings['io_priority'] = section.getint('IO_PRIORITY', 4)
+
+    return settings
+
+
+def parse_cpus(value):
+    """Parses a CPU list such as '0,2' or '2-3' into a set of CPU numbers"""
+    cpus = set()
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        cpus.update(range(int(first), int(last or first) + 1))
+    if not cpus:
+        raise ValueError('CPU_AFFINITY is empty')
+    return cpus
+
+
+def apply_settings(pid, settings):
+    """Applies scheduling settings from parse_settings() to a process.
+
+    Each setting is applied on its own, one that is not permitted, for
+    example a real-time policy without CAP_SYS_NICE, does not prevent the
+    others.
+
+    Returns:
+        list: (setting, error) for the settings that could not be applied
+    """
+    errors = list()
+
+    if 'cpus' in settings:
+        try:
+            os.sched_setaffinity(pid, settings['cpus'])
+        except OSError as e:
+            errors.append(('CPU_AFFINITY', e))
+
+    if 'nice' in settings:
+        try:
+            os.setpriority(os.PRIO_PROCESS, pid, settings['nice'])
+        except OSError as e:
+            errors.append(('NICE', e))
+
+    if 'policy' in settings:
+        try:
+            os.sched_setscheduler(pid, POLICIES[settings['policy']],
+                                  os.sched_param(settings['priority']))
+        except OSError as e:
+            errors.append(('SCHED_POLICY', e))
+
+    if 'io_class' in settings:
+        # There is no ioprio_set() in the os module, util-linux's ionice
+        # is used instead of a per architecture syscall number
+        command = ['ionice', '-c', str(IO_CLASSES[settings['io_class']])]
+        if settings['io_class'] != 'IDLE':
+            command += ['-n', str(settings['io_priority'])]
+        command += ['-p', str(pid)]
+        try:
+            subprocess.run(command, check=True, capture_output=True,
+                           timeout=5)
+        except subprocess.CalledProcessError as e:
+            errors.append(('IO_CLASS', e.stderr.decode().strip()))
+        except (OSError, subprocess.TimeoutExpired) as e:
+            errors.append(('IO_CLASS', e))
+
+    return errors
+
+
+def run_unit(operate, name, settings, log_queue):
+    """Process target for a unit. The scheduling settings are applied in
+    the child before operate() starts any threads, each thread then
+    inherits them from the main thread.
+    """
+    errors = apply_settings(0, settings)
+    if errors:
+        log = get_worker_log(name, log_queue)
+        for setting, error in errors:
+            log.warning(f'Could not apply {setting} to program {name}. '
+                        f'{error}')
+    operate()
@@ -12,6 +12,27 @@ class GUI_CONST(CONST):
     FONTS_DIR = ASSET_DIR.joinpath('fonts')
     TEXTURE_DIR = ASSET_DIR.joinpath('textures')
 
+    # Seconds between database polls by the GUI data service
+    DATA_TICK = 0.5
+    # Data service ticks between settings reads
+    DATA_SETTINGS_TICKS = 4
+
+    # Audio, sounds are converted to this rate when they are loaded
+    SOUND_RATE = 48000
+    # Seconds of audio mixed per write to the player
+    SOUND_CHUNK = 0.02
+    # Seconds of audio buffered by the player, the delay before a sound
+    SOUND_BUFFER_TIME = 0.1
+    # Maximum sounds played at once
+    SOUND_VOICES = 4
+    # Seconds without a sound before the player is closed
+    SOUND_IDLE_TIME = 60
+
+    # Number of system log entries kept in the log viewers
+    LOG_VIEW_ROWS = 200
+    # Number of alarm history entries kept in the alarm viewer
+    ALARM_HISTORY_ROWS = 200
+
     # File Names
     VOLUME_INI = CONST.CONFIG_DIR.joinpath('sounds.ini')
 
@@ -0,0 +1,197 @@
+from kivy.clock import Clock
+from kivy.event import EventDispatcher
+from kivy.properties import (NumericProperty, BooleanProperty,
+                             DictProperty, ListProperty)
+
+from gui.constants import GUI_CONST
+
+
+class GUIDataService(EventDispatcher):
+    """Single source of database values for the GUI.
+
+    The database is polled once per GUI_CONST.DATA_TICK and the results are
+    published through Kivy properties, which are only assigned when their
+    value has changed so bound widgets are only updated on changes. Screens
+    bind to these properties instead of running their own clocks and
+    queries, so every screen shows the same values.
+
+    The reads run on the query executor's worker thread and the results
+    are applied on the main thread. A tick is skipped if the previous one
+    is still waiting to run.
+
+    The alarm state and settings are always polled, the alarm state only
+    when the Alarms change version moves. Other sources are only polled
+    while something is subscribed to them, see subscribe().
+
+    Sources:
+        'data': datapoint values and locks (data, locks)
+        'programs': program attributes (programs)
+        'syslog': system log entries (syslog, on_syslog)
+
+    Events:
+        on_data_changes(changes): {datapoint: value} of the changed values
+        on_lock_changes(changes): {datapoint: lock owner} of the changed
+        locks, None for a released lock
+        on_syslog(entries): new syslog entries, newest first
+    """
+    alarm_version = NumericProperty(-1)
+    alarm_level = NumericProperty(0)
+    clr_alarm = BooleanProperty(False)
+    settings = DictProperty()
+    data = DictProperty()
+    locks = DictProperty()
+    programs = DictProperty()
+    syslog = ListProperty()
+
+    SOURCES = ('data', 'programs', 'syslog')
+
+    __events__ = ('on_data_changes', 'on_lock_changes', 'on_syslog')
+
+    def __init__(self, database, alarm_database, executor, **kwargs):
+        super().__init__(**kwargs)
+        self.db = database
+        self.adb = alarm_database
+        self.executor = executor
+        self._subscribers = dict.fromkeys(self.SOURCES, 0)
+        self._settings_count = 0
+        self._last_syslog = None
+        self._clock = None
+
+    def start(self):
+        self.update()
+        self._clock = Clock.schedule_interval(self.update,
+                                              GUI_CONST.DATA_TICK)
+
+    def stop(self):
+        if self._clock is not None:
+            self._clock.cancel()
+
+    def subscribe(self, source):
+        """Starts polling a source, the source is refreshed immediately"""
+        self._subscribers[source] += 1
+        if self._subscribers[source] == 1:
+            self.refresh(source)
+
+    def unsubscribe(self, source):
+        if self._subscribers[source] > 0:
+            self._subscribers[source] -= 1
+
+    def refresh(self, source):
+        """Re-reads a source now, e.g. after the GUI has written to it.
+        Queued behind the write, so the result includes it.
+        """
+        self._submit({source}, force=True, key=('data_service', source))
+
+    def update(self, *args):
+        sources = {'alarms'}
+        self._settings_count -= 1
+        if self._settings_count <= 0:
+            self._settings_count = GUI_CONST.DATA_SETTINGS_TICKS
+            sources.add('settings')
+
+        for source, count in self._subscribers.items():
+            if count:
+                sources.add(source)
+
+        self._submit(sources, key='data_service')
+
+    def _submit(self, sources, force=False, key=None):
+        self.executor.submit(self._read, sources,
+                             alarm_version=None if force
+                             else self.alarm_version,
+                             last_syslog=self._last_syslog,
+                             callback=self._apply, key=key)
+
+    def _read(self, sources, alarm_version, last_syslog):
+        """Runs on the query executor's thread, returns {source: result}"""
+        results = dict()
+        if 'alarms' in sources:
+            version = self.adb.alarm_version()
+            if version is None:
+                version = -1
+            if version == -1 or version != alarm_version:
+                results['alarms'] = (version, self.adb.is_act_alarm(),
+                                     self.adb.is_clr_alarm())
+
+        if 'settings' in sources:
+            results['settings'] = self.db.setting_read_multiple()
+
+        if 'data' in sources:
+            results['data'] = self.db.data_read_with_locks()
+
+        if 'programs' in sources:
+            results['programs'] = self.db.program_read_all()
+
+        if 'syslog' in sources:
+            results['syslog'] = self.db.get_syslog_entries(
+                                    human_time=True,
+                                    after_id=last_syslog,
+                                    limit=GUI_CONST.LOG_VIEW_ROWS)
+        return results
+
+    def _apply(self, results):
+        """Publishes the results of _read() on the main thread"""
+        if 'alarms' in results:
+            version, level, clr_alarm = results['alarms']
+            # The version last so bindings on it see the new alarm state
+            self.alarm_level = level
+            self.clr_alarm = clr_alarm
+            self.alarm_version = version
+
+        settings = results.get('settings')
+        if settings and settings != self.settings:
+            self.settings = settings
+
+        if results.get('data'):
+            self._apply_data(*results['data'])
+
+        programs = results.get('programs')
+        if programs and programs != self.programs:
+            self.programs = programs
+
+        if results.get('syslog'):
+            self._apply_syslog(results['syslog'])
+
+    def _apply_data(self, data, locks):
+        changes = self.diff(self.data, data)
+        if changes or len(data) != len(self.data):
+            self.data = data
+        if changes:
+            self.dispatch('on_data_changes', changes)
+
+        changes = self.diff(self.locks, locks)
+        changes.update({dp: None for dp in self.locks if dp not in locks})
+        if changes:
+            self.locks = locks
+            self.dispatch('on_lock_changes', changes)
+
+    @staticmethod
+    def diff(old, new):
+        """Returns the items of new that are not in, or differ from, old"""
+        return {key: value for key, value in new.items()
+                if key not in old or old[key] != value}
+
+    def _apply_syslog(self, entries):
+        # Overlapping reads can return the same entries twice
+        if self._last_syslog is not None:
+            entries = [entry for entry in entries
+                       if int(entry['log_entry']) > self._last_syslog]
+        if not entries:
+            return
+
+        self._last_syslog = int(entries[0]['log_entry'])
+        self.syslog = (entries + self.syslog)[:GUI_CONST.LOG_VIEW_ROWS]
+        self.dispatch('on_syslog', entries)
+
+    def setting(self, owner, setting, default=None):
+        """Returns a setting from the last settings read"""
+        return self.settings.get(owner, dict()).get(setting, default)
+
+    def on_data_changes(self, changes):
+        pass
+
+    def on_lock_changes(self, changes):
+        pass
+
+    def on_syslog(self, entries):
+        pass
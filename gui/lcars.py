@@ -11,10 +11,14 @@ from kivy.core.window import Window
 from kivy.uix.popup import Popup
 from kivy.core.text import LabelBase
 from kivy.animation import Animation
+from kivy.logger import Logger
 from kivy.properties import ObjectProperty, DictProperty, BooleanProperty
 
 from gui.constants import GUI_CONST
-from gui.widgets.lcars_popup import LCARSExitPopup
+from gui.startup import STARTUP
+from gui.data_service import GUIDataService
+from gui.widgets.lcars_sound import get_engine
+from gui.query_executor import GUIQueryExecutor
 from app.database import GUIDatabase, AlarmDatabase
 
 
@@ -47,6 +51,8 @@ class MainDisplay(Widget):
         self.app = App.get_running_app()
         self.db = self.app.database
         self.adb = self.app.alarm_database
+        self.executor = self.app.query_executor
+        self.service = self.app.data_service
 
         self.screen = self.Screen()
         self.fade_timer = Clock.schedule_once(self.start_screen_saver, 30)
@@ -111,47 +117,70 @@ class MainDisplay(Widget):
 
         self.info_grid_text[8] = 'T' + self.get_cpu_temperature()
 
-        if self.adb.is_act_alarm() != 0:
+        if self.service.alarm_level != 0:
             self.alarming = not self.alarming
-            if self.db.setting_read_single('alarm_scan', 'wake_on_alarm'):
+            if self.service.setting('alarm_scan', 'wake_on_alarm'):
                 self.reset_screen_saver()
         else:
             self.alarming = False
 
     def alarm_silence(self):
-        self.adb.silence_alarms()
+        self.executor.submit(self.adb.silence_alarms)
+        self.service.refresh('alarms')
 
     def take_screenshot(self):
         dt = strftime('%Y%m%d-%H%M%S-')
         Window.screenshot(name=f'{dt}.png')
 
     def close_gui(self):
+        # Imported here, the popups pull in the on screen keyboard
+        from gui.widgets.lcars_popup import LCARSExitPopup
         LCARSExitPopup().open()
 
 
 class LCARSApp(App):
     sounds = ObjectProperty()
 
-    LabelBase.register(name='LCARS_Bold',
-                       fn_regular=str(GUI_CONST.LCARS_BOLD))
-    LabelBase.register(name='LCARS_Semi_Bold',
-                       fn_regular=str(GUI_CONST.LCARS_SEMI_BOLD))
-    LabelBase.register(name='LCARS_Regular',
-                       fn_regular=str(GUI_CONST.LCARS_REGULAR))
-    LabelBase.register(name='LCARS_Light',
-                       fn_regular=str(GUI_CONST.LCARS_LIGHT))
-    LabelBase.register(name='LCARS_Thin',
-                       fn_regular=str(GUI_CONST.LCARS_THIN))
-
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.database = GUIDatabase()
         self.alarm_database = AlarmDatabase()
+        self.query_executor = GUIQueryExecutor(self.database,
+                                               self.alarm_database)
+        self.data_service = GUIDataService(self.database,
+                                           self.alarm_database,
+                                           self.query_executor)
 
     def build(self):
-        return MainDisplay()
+        LabelBase.register(name='LCARS_Bold',
+                           fn_regular=str(GUI_CONST.LCARS_BOLD))
+        LabelBase.register(name='LCARS_Semi_Bold',
+                           fn_regular=str(GUI_CONST.LCARS_SEMI_BOLD))
+        LabelBase.register(name='LCARS_Regular',
+                           fn_regular=str(GUI_CONST.LCARS_REGULAR))
+        LabelBase.register(name='LCARS_Light',
+                           fn_regular=str(GUI_CONST.LCARS_LIGHT))
+        LabelBase.register(name='LCARS_Thin',
+                           fn_regular=str(GUI_CONST.LCARS_THIN))
+
+        self.data_service.start()
+        get_engine().start()  # Opens the audio player ahead of first use
+        root = MainDisplay()
+        STARTUP.mark('build')
+        return root
+
+    def on_start(self):
+        Window.bind(on_flip=self._first_frame)
+
+    def _first_frame(self, *args):
+        Window.unbind(on_flip=self._first_frame)
+        STARTUP.mark('first frame')
+        STARTUP.report(Logger)
 
     def stop(self, *args, **kwargs):
+        self.data_service.stop()
+        get_engine().stop()
+        self.query_executor.shutdown()
         self.alarm_database.close_connection()
         self.database.close_connection()
         super().stop(*args, **kwargs)
@@ -0,0 +1,132 @@
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from functools import partial
+
+from kivy.clock import Clock
+
+from app.syslog import get_local_log
+
+
+class _Request:
+    """A submitted call, its future and the callbacks waiting on it"""
+    __slots__ = ('future', 'callbacks', 'owner', 'withdrawn')
+
+    def __init__(self, callback, owner):
+        self.future = None
+        self.callbacks = [callback] if callback is not None else []
+        self.owner = id(owner) if owner is not None else None
+        self.withdrawn = False
+
+
+class GUIQueryExecutor:
+    """Runs GUI database calls on a single worker thread.
+
+    The database classes keep one connection per thread, so calls made
+    here use the worker's own connection and a slow query, or a writer
+    holding the database lock, no longer stalls the Kivy main loop. One
+    worker keeps the calls in the order they were submitted, a write
+    followed by a read sees the write.
+
+    Results are passed to the callback on the Kivy main thread through
+    Clock.schedule_once.
+
+    Requests with a key are de-duplicated, submitting a key that is still
+    waiting to run returns the waiting request. Requests with an owner can
+    be cancelled with cancel(owner), e.g. when leaving a screen, a request
+    that is already running completes but its callback is not called.
+    """
+
+    def __init__(self, *databases):
+        self.log = get_local_log('GUI_Query')
+        self._databases = databases
+        self._executor = ThreadPoolExecutor(max_workers=1,
+                                            thread_name_prefix='GUI_Query')
+        self._lock = threading.Lock()
+        self._keyed = dict()  # {key: request} waiting to run
+        self._owned = dict()  # {owner id: set of requests}
+
+    def submit(self, func, *args, callback=None, key=None, owner=None,
+               **kwargs):
+        """Queues func(*args, **kwargs) on the worker thread
+
+        Args:
+            func (callable): Usually a database method
+            callback (callable, optional): Called with the result on the
+            main thread. Not called if func raises or is cancelled.
+            key (hashable, optional): De-duplicates waiting requests
+            owner (object, optional): Used by cancel()
+
+        Returns:
+            Future: concurrent.futures.Future of the result
+        """
+        with self._lock:
+            if key is not None and key in self._keyed:
+                request = self._keyed[key]
+                if callback is not None:
+                    request.callbacks.append(callback)
+                return request.future
+
+            request = _Request(callback, owner)
+            request.future = self._executor.submit(self._run, key, func,
+                                                   args, kwargs)
+            if key is not None:
+                self._keyed[key] = request
+            if request.owner is not None:
+                self._owned.setdefault(request.owner, set()).add(request)
+
+        request.future.add_done_callback(partial(self._done, request))
+        return request.future
+
+    def _run(self, key, func, args, kwargs):
+        with self._lock:
+            if key is not None:
+                self._keyed.pop(key, None)
+        return func(*args, **kwargs)
+
+    def _done(self, request, future):
+        # Runs on the worker thread, or the caller's thread if cancelled
+        with self._lock:
+            if request.owner is not None:
+                owned = self._owned.get(request.owner)
+                if owned is not None:
+                    owned.discard(request)
+                    if not owned:
+                        del self._owned[request.owner]
+
+        if future.cancelled() or not request.callbacks:
+            return
+        Clock.schedule_once(partial(self._deliver, request), 0)
+
+    def _deliver(self, request, *args):
+        if request.withdrawn:
+            return
+        try:
+            result = request.future.result()
+        except CancelledError:
+            return
+        except Exception as e:
+            self.log.warning(f'GUI query failed. {e}')
+            return
+
+        for callback in request.callbacks:
+            callback(result)
+
+    def cancel(self, owner):
+        """Cancels the owner's waiting requests and drops the callbacks of
+        any that are running"""
+        with self._lock:
+            requests = self._owned.pop(id(owner), set())
+            for key, request in list(self._keyed.items()):
+                if request in requests:
+                    del self._keyed[key]
+
+        for request in requests:
+            request.withdrawn = True
+            request.future.cancel()
+
+    def shutdown(self):
+        """Stops the worker once the queued calls have run"""
+        for database in self._databases:
+            self._executor.submit(database.close_thread_connection)
+        self._executor.shutdown(wait=True)
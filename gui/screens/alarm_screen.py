@@ -18,60 +18,88 @@ class AlarmScreen(Screen):
         super().__init__(**kw)
         self.app = App.get_running_app()
         self.adb = self.app.alarm_database
-        self.db = self.app.database
-        self.display_clock = Clock.schedule_interval(self.update, 1.0)
-        self.display_clock.cancel()  # Just create the clock, don't run it
-        self.horn_clock = Clock.schedule_interval(self.check_horn, 0.5)
+        self.executor = self.app.query_executor
+        self.service = self.app.data_service
         self.alarm_horn = Clock.schedule_interval(self._alarm_horn, 3.0)
         self.alarm_horn.cancel()
         self.clear_horn = Clock.schedule_interval(self._clear_horn, 3.0)
-        self.alarm_horn.cancel()
+        self.clear_horn.cancel()
         self.sounds = SoundMachine()
+        self.last_history = None
+        self.service.bind(alarm_level=self.check_horn,
+                          clr_alarm=self.check_horn)
+        self.check_horn()
         self.update()
 
     def update(self, *args):
+        # Called by the data service when the alarms have changed
+        self.executor.submit(self._read_alarms, self.last_history,
+                             callback=self._show_alarms,
+                             key=('alarm_screen', self.last_history),
+                             owner=self)
+
+    def _read_alarms(self, last_history):
+        # Runs on the query executor's thread
         t_current = self.adb.get_alarms(human_time=True)
+        t_history = self.adb.get_alarm_history(
+                        human_time=True,
+                        after_id=last_history,
+                        limit=GUI_CONST.ALARM_HISTORY_ROWS)
+        return t_current, t_history
+
+    def _show_alarms(self, result):
+        t_current, t_history = result
         if t_current is None:
             t_current = list()
         self.alarm_data = t_current
-        
-        t_history = self.adb.get_alarm_history(human_time=True)
-        if t_history is None:
-            t_history = list()
-        self.history_data = t_history
+
+        if t_history is not None:
+            if self.last_history is not None:
+                t_history = [row for row in t_history
+                             if int(row['log_id']) > self.last_history]
+            if not t_history:
+                return
+            self.last_history = int(t_history[0]['log_id'])
+            self.history_data = (t_history + self.history_data
+                                 )[:GUI_CONST.ALARM_HISTORY_ROWS]
 
     def on_pre_enter(self):
-        self.display_clock()  # Restart the update clock
+        self.update()
+        self.service.bind(alarm_version=self.update)
 
     def on_pre_leave(self):
-        self.display_clock.cancel()
+        self.service.unbind(alarm_version=self.update)
+        self.executor.cancel(self)
 
     def silence(self):
-        self.adb.silence_alarms()
+        self.executor.submit(self.adb.silence_alarms)
+        self.service.refresh('alarms')
 
     def accept(self):
-        self.adb.acknowledge_alarms()
+        self.executor.submit(self.adb.acknowledge_alarms)
+        self.service.refresh('alarms')
 
     def reset(self):
-        self.adb.clear_alarms()
+        self.executor.submit(self.adb.clear_alarms)
+        self.service.refresh('alarms')
 
     def _alarm_horn(self, *args):
-        if self.db.setting_read_single('alarm_scan', 'sound_on_alarm'):
+        if self.service.setting('alarm_scan', 'sound_on_alarm'):
             self.sounds.play_sound('hail')
 
     def _clear_horn(self, *args):
-        if self.db.setting_read_single('alarm_scan', 'sound_on_clear'):
+        if self.service.setting('alarm_scan', 'sound_on_clear'):
             self.sounds.play_sound('clear')
 
-    def check_horn(self, dt):
-        if self.adb.is_act_alarm() > 0:
+    def check_horn(self, *args):
+        if self.service.alarm_level > 0:
             if not self.alarm_horn.is_triggered:
                 self._alarm_horn()
                 self.alarm_horn()  # Schedule repeating horn
         else:
             self.alarm_horn.cancel()
 
-        if self.adb.is_clr_alarm():
+        if self.service.clr_alarm:
             if not self.clear_horn.is_triggered:
                 self._clear_horn()
                 self.clear_horn()
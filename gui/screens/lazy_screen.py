@@ -0,0 +1,44 @@
+import importlib
+import time
+
+from kivy.logger import Logger
+from kivy.properties import StringProperty, ObjectProperty
+from kivy.uix.screenmanager import Screen
+
+
+class LazyScreen(Screen):
+    """Placeholder for a screen that is only imported and built the first
+    time it is shown, so its module, kv file and widgets do not slow down
+    startup.
+
+    screen_class is the dotted path of the real screen class. The real
+    screen is added as the only child and receives this screen's enter and
+    leave events.
+    """
+    screen_class = StringProperty()
+    screen = ObjectProperty(None, allownone=True)
+
+    def load(self):
+        if self.screen is not None:
+            return self.screen
+
+        t1 = time.perf_counter()
+        module_name, class_name = self.screen_class.rsplit('.', 1)
+        module = importlib.import_module(module_name)
+        self.screen = getattr(module, class_name)(name=self.name)
+        self.add_widget(self.screen)
+        Logger.info(f'LCARS: {self.name} screen loaded in '
+                    f'{time.perf_counter() - t1:.2f}s')
+        return self.screen
+
+    def on_pre_enter(self, *args):
+        self.load().dispatch('on_pre_enter')
+
+    def on_enter(self, *args):
+        self.screen.dispatch('on_enter')
+
+    def on_pre_leave(self, *args):
+        self.screen.dispatch('on_pre_leave')
+
+    def on_leave(self, *args):
+        self.screen.dispatch('on_leave')
@@ -1,5 +1,4 @@
 from kivy.app import App
-from kivy.clock import Clock
 from kivy.lang.builder import Builder
 from kivy.properties import ListProperty
 from kivy.uix.screenmanager import Screen
@@ -15,16 +14,17 @@ class LogScreen(Screen):
     def __init__(self, **kw):
         super().__init__(**kw)
         self.app = App.get_running_app()
-        self.db = self.app.database
-        self.clock = Clock.schedule_interval(self.update, 1)
-        self.clock.cancel()  # Create the clock, don't run it
-        self.update()
+        self.service = self.app.data_service
 
     def update(self, *args):
-        self.log_data = self.db.get_syslog_entries(human_time=True)
+        # The data service keeps the latest entries
+        self.log_data = self.service.syslog
 
     def on_pre_enter(self):
-        self.clock()
+        self.service.bind(syslog=self.update)
+        self.service.subscribe('syslog')
+        self.update()
 
     def on_pre_leave(self):
-        self.clock.cancel()
+        self.service.unsubscribe('syslog')
+        self.service.unbind(syslog=self.update)
@@ -1,3 +1,5 @@
+from functools import partial
+
 from kivy.app import App
 from kivy.uix.screenmanager import Screen
 from kivy.lang.builder import Builder
@@ -35,24 +37,35 @@ class ProgramScreen(Screen):
         self.sounds = SoundMachine()
         self.app = App.get_running_app()
         self.db = self.app.database
-
-        self.display_clock = Clock.schedule_interval(self.update_display, 1)
-        self.display_clock.cancel()  # Just create the clock, don't run it
+        self.executor = self.app.query_executor
+        self.service = self.app.data_service
 
         self.current_page = 1
         self.sel_pg_btn = (1, -1)
-        self.program_book = self.create_book()
+        # Filled from the data service's programs, see update_display()
+        self.program_book = self.create_book(self.service.programs)
         self.assign_buttons()
         self.popup = None
         self.popup_open = False
+        self.last_log_entry = None
+        self._log_load = 0  # Identifies the latest load_log_entries()
 
     def on_pre_enter(self):
-        self.display_clock()
+        self.service.bind(programs=self.update_display,
+                          on_syslog=self.add_log_entries)
+        self.service.subscribe('programs')
+        self.service.subscribe('syslog')
+        self.load_log_entries()
+        self.update_display()
 
     def on_pre_leave(self):
-        self.display_clock.cancel()
+        self.service.unsubscribe('programs')
+        self.service.unsubscribe('syslog')
+        self.service.unbind(programs=self.update_display,
+                            on_syslog=self.add_log_entries)
+        self.executor.cancel(self)
 
-    def create_book(self):
+    def create_book(self, programs):
         _bdict = {0: self.base_buttons[0],
                   1: self.base_buttons[1],
                   2: self.base_buttons[2],
@@ -62,7 +75,7 @@ class ProgramScreen(Screen):
         btn = 0
         page = 1
 
-        for program in self.db.program_list():
+        for program in programs:
             book[page][btn] = program
             btn += 1
             if btn == 5:
@@ -78,7 +91,8 @@ class ProgramScreen(Screen):
             if program is None:
                 btn_text = None
             else:
-                btn_text = self.db.program_read(program)['ButtonText']
+                btn_text = self.service.programs.get(
+                    program, {}).get('ButtonText')
             self.button_text[btn] = btn_text
 
         pg, btn = self.sel_pg_btn
@@ -111,7 +125,12 @@ class ProgramScreen(Screen):
     def open_group(self, *args):
         if not self.screen_open:
             id = self.sel_pg_btn[1]
-            self.program = self.program_book[self.current_page][id]
+            program = self.program_book[self.current_page][id]
+            if program != self.program:
+                self.program = program
+                self.last_log_entry = None
+                self.log_data = []
+                self.load_log_entries()
             self.screen_open = True
             self.sounds.play_sound('screen_on')
             self.update_display()
@@ -138,14 +157,50 @@ class ProgramScreen(Screen):
         self.selected = self.sel_pg_btn[1]
 
     def update_display(self, *args):
-        t_data = self.db.program_read(self.program)
-        t_logs = self.db.get_syslog_entries(name=self.program,
-                                            human_time=True)
-        if t_data is not None:
+        # Called by the data service when the programs have changed
+        book = self.create_book(self.service.programs)
+        if book != self.program_book:
+            self.program_book = book
+            self.current_page = min(self.current_page, len(book))
+        self.assign_buttons()
+
+        t_data = self.service.programs.get(self.program)
+        if t_data is not None and t_data != self.program_data:
             self.program_data = t_data
-        
-        if t_logs is not None:
-            self.log_data = t_logs
+
+    def load_log_entries(self):
+        """Fetches the program's entries missed while the screen was not
+        following the data service's log feed"""
+        self._log_load += 1
+        self.executor.submit(self.db.get_syslog_entries,
+                             name=self.program,
+                             human_time=True,
+                             after_id=self.last_log_entry,
+                             limit=GUI_CONST.LOG_VIEW_ROWS,
+                             callback=partial(self._logs_loaded,
+                                              self._log_load),
+                             owner=self)
+
+    def _logs_loaded(self, load, t_logs):
+        # A later load, for example for another program, supersedes this one
+        if load == self._log_load and t_logs is not None:
+            self.add_log_entries(self.service, t_logs)
+
+    def add_log_entries(self, service, entries):
+        """Merges entries from a load or the data service's feed into the
+        view by entry number, newest first, so the order they arrive in
+        does not matter.
+        """
+        known = {int(entry['log_entry']) for entry in self.log_data}
+        t_logs = [entry for entry in entries
+                  if entry['log_name'] == self.program
+                  and int(entry['log_entry']) not in known]
+        if t_logs:
+            log_data = sorted(t_logs + self.log_data,
+                              key=lambda entry: int(entry['log_entry']),
+                              reverse=True)[:GUI_CONST.LOG_VIEW_ROWS]
+            self.last_log_entry = int(log_data[0]['log_entry'])
+            self.log_data = log_data
 
     def period_popup(self, *args):
         self.popup = LCARSNumericPopup(update_callback=self._popup_callback)
@@ -159,7 +214,8 @@ class ProgramScreen(Screen):
         self.update_program(name=kwargs['owner'], period=kwargs['value'])
         
     def update_program(self, **kwargs):
-        self.db.program_write(**kwargs)
+        self.executor.submit(self.db.program_write, **kwargs)
+        self.service.refresh('programs')
     
     def detail_request(self):
         print('Detail screen for',
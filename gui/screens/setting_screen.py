@@ -31,9 +31,8 @@ class SettingScreen(Screen):
         self.sounds = SoundMachine()
         self.app = App.get_running_app()
         self.db = self.app.database
-
-        self.display_clock = Clock.schedule_interval(self.update_display, 1)
-        self.display_clock.cancel()  # Just create the clock, don't run it
+        self.executor = self.app.query_executor
+        self.service = self.app.data_service
 
         self.current_page = 1
         self.sel_pg_btn = (1, -1)
@@ -42,10 +41,11 @@ class SettingScreen(Screen):
         self.popup_open = False
 
     def on_pre_enter(self):
-        self.display_clock()
+        self.service.bind(settings=self.update_display)
+        self.update_display()
 
     def on_pre_leave(self):
-        self.display_clock.cancel()
+        self.service.unbind(settings=self.update_display)
 
     def create_book(self):
         _bdict = {0: self.base_buttons[0],
@@ -57,7 +57,7 @@ class SettingScreen(Screen):
         btn = 0
         page = 1
 
-        for owner in self.db.setting_owners():
+        for owner in self.service.settings:
             book[page][btn] = owner
             btn += 1
             if btn == 5:
@@ -129,21 +129,25 @@ class SettingScreen(Screen):
         self.selected = self.sel_pg_btn[1]
 
     def update_display(self, *args):
-        self.settings = list()
-        index = 0
-        st = self.db.setting_read_multiple(self.owner)
+        # Called by the data service when the settings have changed
+        self.current_page = min(self.current_page,
+                                len(self.create_book()))
+        self.assign_buttons()
+        st = self.service.settings.get(self.owner)
         if st is None:
+            self.settings = list()
             return
-        for setting, value in st[self.owner].items():
-            self.settings.append({'setting': str(setting),
-                                  'value': str(value),
-                                  'type': str(type(value).__name__),
-                                  'index': index})
-            index += 1
+
+        settings = list()
+        for index, (setting, value) in enumerate(st.items()):
+            settings.append({'setting': str(setting),
+                             'value': str(value),
+                             'type': str(type(value).__name__),
+                             'index': index})
+        self.settings = settings
 
         if self.popup_open and isinstance(self.popup, LCARSBooleanPopup):
-            self.popup.value = self.db.setting_read_single(self.owner,
-                                                           self.popup.setting)
+            self.popup.value = st.get(self.popup.setting)
 
     def setting_select(self, **kwargs):
         if kwargs['val_type'] == 'bool':
@@ -163,9 +167,11 @@ class SettingScreen(Screen):
         self.popup_open = True
     
     def update_setting(self, **kwargs):
-        self.db.setting_write(kwargs['owner'],
-                              kwargs['setting'],
-                              kwargs['value'])
+        self.executor.submit(self.db.setting_write,
+                             kwargs['owner'],
+                             kwargs['setting'],
+                             kwargs['value'])
+        self.service.refresh('settings')
         
     def stop_popup_update(self, *args):
         self.popup_open = False
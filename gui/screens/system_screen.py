@@ -5,7 +5,6 @@ from kivy.properties import DictProperty, BooleanProperty
 from kivy.app import App
                              
 from gui.constants import GUI_CONST
-from gui.widgets.lcars_popup import LCARSBoolEquipmentPopup
 
 Builder.load_file(str(GUI_CONST.SCREEN_DIR.joinpath('system_screen.kv')))
 
@@ -28,33 +27,60 @@ class SystemScreen(Screen):
         self.popup = None
         self.app = App.get_running_app()
 
-        self.db = self.app.database       
-        self.display_clock = Clock.schedule_interval(self.update_display, 1)
-        self.display_clock.cancel()  # Just create the clock, don't run it
-        
+        self.db = self.app.database
+        self.executor = self.app.query_executor
+        self.service = self.app.data_service
+
         self.wc_btn_clock = Clock.schedule_interval(self.update_wc_btn, .5)
         self.wc_btn_clock.cancel()  # Just create the clock, don't run it
         self.wc_ini_status = None
         self.wc_ini_locks = None
         self.wc_counter = 0
+        self.io_points = None
 
     def on_pre_enter(self):
-        self.display_clock()
+        if self.io_points is None:
+            # Only datapoints shown on this screen are copied into status
+            self.io_points = {widget.io_point for widget in self.walk()
+                              if hasattr(widget, 'io_point')}
+        self.service.bind(on_data_changes=self.update_status,
+                          on_lock_changes=self.update_locks)
+        self.service.subscribe('data')
+        self.update_display()
 
     def on_pre_leave(self):
-        self.display_clock.cancel()
+        self.service.unsubscribe('data')
+        self.service.unbind(on_data_changes=self.update_status,
+                            on_lock_changes=self.update_locks)
 
     def update_display(self, *args):
-        self.status = self.db.data_read().copy()
-        self.locks = self.db.data_get_locks().copy()
-        
-        if self.popup_open and isinstance(self.popup, LCARSBoolEquipmentPopup):
-            self.popup.value = self.status[self.popup.setting]
-            lock = self.db.data_is_locked(self.popup.setting)
-            if lock == None:
-                self.popup.overridden = False
+        # Catch up with changes made while the screen was not shown
+        self.update_status(self.service,
+                           self.service.diff(self.status, self.service.data))
+        locks = self.service.diff(self.locks, self.service.locks)
+        locks.update({dp: None for dp in self.locks
+                      if dp not in self.service.locks})
+        self.update_locks(self.service, locks)
+
+    def update_status(self, service, changes):
+        # Only the changed keys are updated, and only if they are shown
+        shown = {dp: value for dp, value in changes.items()
+                 if dp in self.io_points}
+        if shown:
+            self.status.update(shown)
+
+        if self.popup_open and self.popup.setting in changes:
+            self.popup.value = changes[self.popup.setting]
+
+    def update_locks(self, service, changes):
+        for dp, owner in changes.items():
+            if owner is None:
+                self.locks.pop(dp, None)
             else:
-                self.popup.overridden = True
+                self.locks[dp] = owner
+
+        if self.popup_open and self.popup.setting in changes:
+            self.popup.overridden = changes[self.popup.setting] is not None
 
     def update_wc_btn(self, *args):
         if self.wc_cancel and self.wc_confirm:
@@ -71,12 +97,12 @@ class SystemScreen(Screen):
             self.wc_start = True
 
     def equipment_select(self, **kwargs):
-        value = self.db.data_read_single(kwargs['d_point'])
-        lock = self.db.data_is_locked(kwargs['d_point'])
-        if lock == None:
-            overridden = False
-        else:
-            overridden = True
+        # Imported here, the popups pull in the on screen keyboard
+        from gui.widgets.lcars_popup import LCARSBoolEquipmentPopup
+
+        # Served from the data service, which polls while this screen is open
+        value = self.service.data.get(kwargs['d_point'])
+        overridden = kwargs['d_point'] in self.service.locks
 
         self.popup = LCARSBoolEquipmentPopup(update_callback=self.update_equip_status,
                                              override_callback=self.update_override,
@@ -90,13 +116,16 @@ class SystemScreen(Screen):
         self.popup_open = True
 
     def update_equip_status(self, **kwargs):
-        self.db.data_write(kwargs['setting'], kwargs['value'], self.app.name)
+        self.executor.submit(self.db.data_write, kwargs['setting'],
+                             kwargs['value'], self.app.name)
+        self.service.refresh('data')
 
     def update_override(self, d_point, override):
         if override:
-            self.db.data_lock(d_point, self.app.name)
+            self.executor.submit(self.db.data_lock, d_point, self.app.name)
         else:
-            self.db.data_unlock(d_point, self.app.name)
+            self.executor.submit(self.db.data_unlock, d_point, self.app.name)
+        self.service.refresh('data')
 
     def stop_popup_update(self, *args):
         self.popup_open = False
@@ -111,23 +140,40 @@ class SystemScreen(Screen):
     def confirm_water_change(self):
         self.wc_confirm = False
         self.wc_cancel = True
-        
-        self.wc_ini_locks = self.db.data_get_locks()
-        self.wc_ini_status = self.db.data_read(self.wc_io_points)
-        
+
+        self.executor.submit(self._start_water_change,
+                             callback=self._water_change_started)
+        self.service.refresh('data')
+
+    def _start_water_change(self):
+        # Runs on the query executor's thread
+        locks = self.db.data_get_locks()
+        status = self.db.data_read(self.wc_io_points)
+
         for io in self.wc_io_points:
-            if io in self.wc_ini_locks:
+            if io in locks:
                 continue
             self.db.data_lock(io, self.app.name)
             self.db.data_write(io, False, self.app.name)
+        return locks, status
+
+    def _water_change_started(self, result):
+        self.wc_ini_locks, self.wc_ini_status = result
+
+    def _end_water_change(self, locks, status):
+        # Runs on the query executor's thread
+        for io in self.wc_io_points:
+            if io in locks:
+                continue
+            self.db.data_write(io, status[io], self.app.name)
+            self.db.data_unlock(io, self.app.name)
 
     def cancel_water_change(self):
-        if self.wc_cancel and not self.wc_confirm:
-            for io in self.wc_io_points:
-                if io in self.wc_ini_locks:
-                    continue
-                self.db.data_write(io, self.wc_ini_status[io], self.app.name)
-                self.db.data_unlock(io, self.app.name)
+        if self.wc_cancel and not self.wc_confirm \
+                and self.wc_ini_locks is not None:
+            self.executor.submit(self._end_water_change,
+                                 self.wc_ini_locks, self.wc_ini_status)
+            self.service.refresh('data')
 
         self.wc_btn_clock.cancel()
         self.wc_confirm = False
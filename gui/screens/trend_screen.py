@@ -39,6 +39,7 @@ class TrendScreen(Screen):
         super().__init__(**kw)
         self.app = App.get_running_app()
         self.db = self.app.database
+        self.executor = self.app.query_executor
         self.plots = dict()
         self.graph_view = None
         self.bind(data_selection=self.update_plot_selection)
@@ -72,12 +73,18 @@ class TrendScreen(Screen):
         return [current_datetime - major_period * i for i in x_values]
 
     def on_pre_enter(self):
-        self.data_list = self.db.data_read()
+        self.executor.submit(self.db.data_read, callback=self._set_data_list,
+                             owner=self)
         self.update_data()
         self.update_clock()
 
     def on_pre_leave(self):
         self.update_clock.cancel()
+        self.executor.cancel(self)
+
+    def _set_data_list(self, data):
+        if data:
+            self.data_list = data
 
     def update_plot_selection(self, *args):
         remove_list = list()
@@ -160,6 +167,15 @@ class TrendScreen(Screen):
         self.graph_view.x_date_labels = self._get_date_values()
 
     def update_data(self, dt=None):
+        self.executor.submit(self._read_entries, tuple(self.plots),
+                             callback=self._plot_entries,
+                             key='trend_screen', owner=self)
+
+    def _read_entries(self, plots):
+        # Runs on the query executor's thread
+        return {plot: self.db.get_datalog_entries(plot) for plot in plots}
+
+    def _plot_entries(self, plot_entries):
         high_y = 1
         low_y = 65535
 
@@ -168,9 +184,10 @@ class TrendScreen(Screen):
         padd = (next_hour - now).seconds
         graph_now = int(time.time()) + padd
 
-        for plot in self.plots.keys():
+        for plot, entries in plot_entries.items():
+            if plot not in self.plots:
+                continue  # Deselected while the entries were read
             n_entries = list()
-            entries = self.db.get_datalog_entries(plot)
             if entries is None:
                 entries = [(0,0)]
 
@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+
+
+class StartupProfiler:
+    """Records how long each GUI startup stage takes.
+
+    Import this module first so the clock starts as early as possible,
+    mark() each stage as it completes and report() once the first frame
+    has been drawn.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = list()
+
+    def mark(self, stage):
+        """Records that stage has just completed"""
+        self.marks.append((stage, time.perf_counter() - self.start))
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def report(self, log):
+        previous = 0.0
+        stages = list()
+        for stage, elapsed in self.marks:
+            stages.append(f'{stage} {elapsed - previous:.2f}s')
+            previous = elapsed
+
+        message = f'LCARS: Startup {", ".join(stages)}'
+        age = process_age()
+        if age is not None:
+            message += f', {age:.2f}s since the process started'
+        log.info(message)
+
+
+def process_age():
+    """Returns the seconds since this process was started, including the
+    interpreter's own startup, None if /proc is not available.
+    """
+    try:
+        with open('/proc/self/stat') as f:
+            # Fields after the command name, starttime is field 22
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        started = int(fields[19]) / os.sysconf('SC_CLK_TCK')
+    except (OSError, IndexError, ValueError):
+        return None
+    return uptime - started
+
+
+def preload_files(paths):
+    """Reads files in a background thread so they are in the page cache
+    when they are first used, e.g. fonts, textures and sounds.
+    """
+    def _read(paths):
+        for path in paths:
+            try:
+                with open(path, 'rb') as f:
+                    while f.read(1 << 16):
+                        pass
+            except OSError:
+                continue
+
+    thread = threading.Thread(target=_read, args=(tuple(paths),),
+                              name='GUI_Preload', daemon=True)
+    thread.start()
+    return thread
+
+
+STARTUP = StartupProfiler()
@@ -52,6 +52,7 @@ Builder.load_string('''
     alarm_description: 'N/A'
     alarm_status: 'N/A'
     alarm_priority: 'N/A'
+    log_id: 'N/A'
 
     AlarmEntryText:
         text: root.alarm_time
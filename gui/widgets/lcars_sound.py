@@ -1,79 +1,280 @@
+import array
 import configparser
+import subprocess
+import threading
+import time
+import wave
+
+try:
+    import audioop
+except ImportError:  # Removed in Python 3.13, the array fallback is used
+    audioop = None
+
+from kivy.logger import Logger
 
 from gui.constants import GUI_CONST
 
-# from kivy.core.audio import SoundLoader
-from subprocess import Popen
 
+def load_clips():
+    """Reads sounds.ini and decodes every clip once
 
-class SoundMachine():
-    def __init__(self) -> None:
-        self.sounds = dict()
-        config_file = GUI_CONST.VOLUME_INI
-        if config_file.is_file():
-            try:
-                config = configparser.ConfigParser()
-                config.optionxform = str
-                config.read(config_file)
-                if 'SOUNDS' in config.sections():
-                    for sound in config['SOUNDS']:
-                        # This is a hack to ensure that volume results to 50%
-                        # if it is not included
-                        # https://stackoverflow.com/questions/44609040/safely-unpacking-results-of-str-split
-                        file, *volume = config['SOUNDS'][sound].split(';')
-                        volume = volume[0] if volume else 50.0
-                        try:
-                            volume = float(volume) / 100
-                        except ValueError:
-                            volume = 0.5
-
-                        file = GUI_CONST.AUDIO_DIR.joinpath(file)
-                        # self.sounds[sound] = SoundLoader.load(str(file))
-                        # self.sounds[sound].volume = volume
-                        self.sounds[sound] = file
-                else:
-                    self.sounds = dict()
-            except IOError:
-                self.sounds = dict()
-        else:
-            self.sounds = dict()
+    Returns:
+        dict: {sound: bytes} of signed 16 bit stereo PCM at
+        GUI_CONST.SOUND_RATE with the configured volume applied
+    """
+    clips = dict()
+    config_file = GUI_CONST.VOLUME_INI
+    if not config_file.is_file():
+        return clips
 
-    def play_sound(self, sound, *args):
-        if sound not in self.sounds:
+    try:
+        config = configparser.ConfigParser()
+        config.optionxform = str
+        config.read(config_file)
+    except (IOError, configparser.Error):
+        return clips
+
+    if 'SOUNDS' not in config.sections():
+        return clips
+
+    for sound in config['SOUNDS']:
+        # This is a hack to ensure that volume results to 50%
+        # if it is not included
+        # https://stackoverflow.com/questions/44609040/safely-unpacking-results-of-str-split
+        file, *volume = config['SOUNDS'][sound].split(';')
+        volume = volume[0] if volume else 50.0
+        try:
+            volume = float(volume) / 100
+        except ValueError:
+            volume = 0.5
+
+        file = GUI_CONST.AUDIO_DIR.joinpath(file.strip())
+        try:
+            clip = decode_clip(file, volume)
+        except (OSError, EOFError, wave.Error) as e:
+            Logger.warning(f'LCARS: Sound {sound} could not be loaded. {e}')
+            continue
+        if clip is None:
+            Logger.warning(f'LCARS: Sound {sound} has an unsupported format.')
+            continue
+        clips[sound] = clip
+    return clips
+
+
+def decode_clip(file, volume):
+    """Converts a wav file to the engine's format, None if unsupported"""
+    with wave.open(str(file), 'rb') as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        data = wav.readframes(wav.getnframes())
+
+    if channels not in (1, 2):
+        return None
+
+    if audioop is not None:
+        if width == 1:
+            # 8 bit wav samples are unsigned, audioop expects signed
+            data = audioop.bias(data, 1, -128)
+        if width != 2:
+            data = audioop.lin2lin(data, width, 2)
+        if channels == 1:
+            data = audioop.tostereo(data, 2, 1, 1)
+        if rate != GUI_CONST.SOUND_RATE:
+            data, _ = audioop.ratecv(data, 2, 2, rate,
+                                     GUI_CONST.SOUND_RATE, None)
+        if volume != 1:
+            data = audioop.mul(data, 2, volume)
+        return data
+
+    if width != 2:
+        return None
+    samples = array.array('h', data)
+    if channels == 1:
+        stereo = array.array('h', bytes(len(samples) * 4))
+        stereo[0::2] = samples
+        stereo[1::2] = samples
+        samples = stereo
+    if rate != GUI_CONST.SOUND_RATE:
+        # Nearest sample, adequate for the short interface sounds
+        frames = len(samples) // 2
+        count = int(frames * GUI_CONST.SOUND_RATE / rate)
+        step = rate / GUI_CONST.SOUND_RATE
+        resampled = array.array('h')
+        for i in range(count):
+            j = int(i * step) * 2
+            resampled.append(samples[j])
+            resampled.append(samples[j + 1])
+        samples = resampled
+    if volume != 1:
+        samples = array.array('h', (_clip(s * volume) for s in samples))
+    return samples.tobytes()
+
+
+def _clip(value):
+    return max(-32768, min(32767, int(value)))
+
+
+def _add(first, second):
+    if audioop is not None:
+        return audioop.add(first, second, 2)
+    return array.array('h', (_clip(a + b) for a, b in
+                             zip(array.array('h', first),
+                                 array.array('h', second)))).tobytes()
+
+
+class AudioEngine:
+    """Plays the decoded clips through one long running aplay process.
+
+    The clips are decoded once, aplay is fed raw PCM over a pipe so there
+    is no process start or wav decode per sound. Sounds that overlap are
+    mixed, up to GUI_CONST.SOUND_VOICES at once, a sound that is already
+    playing is not started again. aplay is kept open, playing silence,
+    for GUI_CONST.SOUND_IDLE_TIME after the last sound and then closed,
+    the next sound opens it again.
+    """
+
+    def __init__(self):
+        self.clips = load_clips()
+        self._cond = threading.Condition()
+        self._voices = list()  # [clip, position]
+        self._thread = None
+        self._player = None
+        self._running = False
+        self._disabled = False
+        self._chunk = int(GUI_CONST.SOUND_RATE * GUI_CONST.SOUND_CHUNK) * 4
+
+    def start(self):
+        """Starts the engine and opens the player ahead of the first sound"""
+        with self._cond:
+            if self._running or self._disabled:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name='GUI_Audio',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(1)
+
+    def play(self, sound):
+        clip = self.clips.get(sound)
+        if clip is None or self._disabled:
             return
-        else:
-            if self.sounds[sound].exists():
-                Popen(['aplay', '-q', self.sounds[sound]])
 
-    '''def beep(self, *args):
-        self.sounds['beep'].play()
+        with self._cond:
+            if len(self._voices) >= GUI_CONST.SOUND_VOICES:
+                return
+            for voice in self._voices:
+                if voice[0] is clip:
+                    return  # Already playing, drop the repeat
+            self._voices.append([clip, 0])
+            self._cond.notify()
+        self.start()
+
+    def _run(self):
+        idle_time = time.monotonic() + GUI_CONST.SOUND_IDLE_TIME
+        while True:
+            with self._cond:
+                if not self._running:
+                    break
+                if self._voices:
+                    chunk = self._mix()
+                    idle_time = time.monotonic() + GUI_CONST.SOUND_IDLE_TIME
+                elif time.monotonic() > idle_time:
+                    self._close_player()
+                    self._cond.wait()
+                    idle_time = time.monotonic() + GUI_CONST.SOUND_IDLE_TIME
+                    continue
+                else:
+                    chunk = bytes(self._chunk)
+
+            # Blocks once aplay's buffer is full, which paces this loop
+            if not self._write(chunk):
+                break
 
-    def accept(self, *args):
-        self.sounds['accept'].play()
+        self._close_player()
+        with self._cond:
+            self._running = False
 
-    def cancel(self, *args):
-        self.sounds['cancel'].play()
+    def _mix(self):
+        chunk = None
+        for voice in list(self._voices):
+            clip, position = voice
+            part = clip[position:position + self._chunk]
+            voice[1] += self._chunk
+            if voice[1] >= len(clip):
+                self._voices.remove(voice)
+            if len(part) < self._chunk:
+                part += bytes(self._chunk - len(part))
+            chunk = part if chunk is None else _add(chunk, part)
+        return chunk
 
-    def deny(self, *args):
-        self.sounds['deny'].play()
+    def _write(self, chunk):
+        for attempt in (1, 2):
+            if self._player is None and not self._open_player():
+                return False
+            try:
+                self._player.stdin.write(chunk)
+                self._player.stdin.flush()
+                return True
+            except (BrokenPipeError, OSError):
+                self._close_player()
+        return False
 
-    def screen_off(self, *args):
-        self.sounds['screen_off'].play()
+    def _open_player(self):
+        try:
+            self._player = subprocess.Popen(
+                ['aplay', '-q', '-t', 'raw', '-f', 'S16_LE', '-c', '2',
+                 '-r', str(GUI_CONST.SOUND_RATE),
+                 f'--buffer-time={int(GUI_CONST.SOUND_BUFFER_TIME * 1e6)}'],
+                stdin=subprocess.PIPE,
+                stderr=subprocess.DEVNULL)
+        except OSError as e:
+            Logger.warning(f'LCARS: Sounds are disabled, aplay could not be '
+                           f'started. {e}')
+            self._disabled = True
+            self._player = None
+            with self._cond:
+                self._voices = list()
+                self._running = False
+            return False
+        return True
+
+    def _close_player(self):
+        if self._player is None:
+            return
+        try:
+            self._player.stdin.close()
+        except OSError:
+            pass
+        try:
+            self._player.wait(1)
+        except subprocess.TimeoutExpired:
+            self._player.kill()
+            self._player.wait()
+        self._player = None
 
-    def screen_on(self, *args):
-        self.sounds['screen_on'].play()
 
-    def busy(self, *args):
-        self.sounds['busy'].play()
+ENGINE = None
 
-    def hail(self, *args):
-        self.sounds['hail'].play()
 
-    def alert(self, *args):
-        self.sounds['alert'].play()
+def get_engine():
+    """Returns the audio engine shared by every SoundMachine"""
+    global ENGINE
+    if ENGINE is None:
+        ENGINE = AudioEngine()
+    return ENGINE
 
-    def critical(self, *args):
-        self.sounds['critical'].play()
 
-    def alarm_clear(self, *args):
-        self.sounds['clear'].play()'''
+class SoundMachine():
+    def __init__(self) -> None:
+        self.engine = get_engine()
+        self.sounds = self.engine.clips
+
+    def play_sound(self, sound, *args):
+        self.engine.play(sound)
@@ -21,6 +21,12 @@ class Cooling(Program):
             'FAIL_STATE_B': self.config['GENERAL'].getboolean('FAIL_STATE_B', False)
             }
 
+        # The IO boards reset the outputs when they start, so they are
+        # waited for as well as the sensors
+        self.requires = [self.settings[key] for key in ('SENSOR_A', 'SENSOR_B',
+                                                        'OUTPUT_A', 'OUTPUT_B')
+                         if self.settings[key]]
+
         self.call_stop_every_cycle = False
         if self.config['MISC'].getboolean('RESET_TO_INI', False):
             for key, value in self.settings.items():
@@ -3,6 +3,9 @@ from drivers.custom_io import CustomIO
 
 
 class DIO_Board(Program):
+    # An IO scanner, the governor never stretches its period
+    CRITICALITY = 'HIGH'
+
     def program_init(self):
         self.io = CustomIO()
         self.period = 0.25
@@ -14,9 +17,11 @@ class DIO_Board(Program):
 
         for io in self.io.get_inputs().keys():
             self.write_datapoint(io, False)
+            self.provides.append(io)
 
         for io in self.io.get_outputs().keys():
             self.write_datapoint(io, False)
+            self.provides.append(io)
 
     def program_run(self):
         database_DO = self.search_datapoint('Custom_DO')
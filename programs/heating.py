@@ -55,6 +55,8 @@ class Heating(Program):
             t_sensor_list.append(item)
 
         self.settings['Sensors'] = ','.join(t_sensor_list)
+        self.requires = t_sensor_list + [self.settings['Output']]
+        self.provides = list(self.datapoints)
 
         if count < 2:
             self.log.warning('Less than two sensors identified.')
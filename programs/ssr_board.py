@@ -3,6 +3,9 @@ from drivers.ssr_hat import SSR_Hat
 
 
 class SSR_Board(Program):
+    # An IO scanner, the governor never stretches its period
+    CRITICALITY = 'HIGH'
+
     def program_init(self):
         self.ssr_hat = SSR_Hat()
         self.period = 0.25
@@ -13,6 +16,7 @@ class SSR_Board(Program):
 
         for output in self.ssr_hat.outputs:
             self.write_datapoint(output.name, False)
+            self.provides.append(output.name)
 
     def program_run(self):
         for output in self.ssr_hat.outputs:
@@ -1,20 +1,34 @@
-from app.program import Program
+import asyncio
+
+from app.async_program import AsyncProgram
 from drivers.w1_sensors import One_Wire
 
 
-class W1_Board(Program):
+class W1_Board(AsyncProgram):
+    # An IO scanner, the governor never stretches its period
+    CRITICALITY = 'HIGH'
+
     def program_init(self):
         self.one_wire = One_Wire()
         self.period = 3
         self.description = 'Axiris one-wire board temperature sensor scanner.'
         self.label = 'TEMPERATURE SENSORS'
         self.button_text = 'TEMP SENSORS'
+        self.provides = [sensor.name for sensor in self.one_wire.sensors]
+
+    async def program_start(self):
+        await self.run_blocking(self.one_wire.sensor_scan)
+        await self.read_sensors()
 
-    def program_start(self):
-        self.one_wire.sensor_scan()
-        for sensor in self.one_wire.sensors:
-            self.write_datapoint(sensor.name, sensor.value)
+    async def program_run(self):
+        await self.read_sensors()
 
-    def program_run(self):
-        for sensor in self.one_wire.sensors:
-            self.write_datapoint(sensor.name, sensor.value)
+    async def read_sensors(self):
+        # Each read waits on the sensor's conversion, reading them together
+        # overlaps the waits across the bus masters
+        sensors = list(self.one_wire.sensors)
+        values = await asyncio.gather(
+            *(self.run_blocking(getattr, sensor, 'value')
+              for sensor in sensors))
+        for sensor, value in zip(sensors, values):
+            self.write_datapoint(sensor.name, value)
@@ -0,0 +1,15 @@
+import atexit
+import shutil
+import tempfile
+
+from pathlib import Path
+
+from app.constants import CONST
+
+# Keep the test database and log out of the source tree. This runs before
+# the test modules are imported, the database classes take their default
+# location from CONST.DB_FOLDER when app.database is imported.
+_data_dir = Path(tempfile.mkdtemp(prefix='logicpi_tests_'))
+atexit.register(shutil.rmtree, _data_dir, ignore_errors=True)
+CONST.DB_FOLDER = _data_dir
+CONST.LOG_FILE = _data_dir / 'syslog.log'
@@ -0,0 +1,133 @@
+import email
+import logging
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+from app.constants import CONST
+from app.notifier import AlarmNotifier
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough of SMTP for smtplib.SMTP.send_message()"""
+
+    def handle(self):
+        self.server.connections.append(self.connection)
+        self.reply('220 localhost ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250 localhost')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = list()
+                for line in self.rfile:
+                    if line == b'.\r\n':
+                        break
+                    data.append(line)
+                self.server.messages.append(
+                    email.message_from_bytes(b''.join(data)))
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:  # MAIL, RCPT, NOOP, RSET
+                self.reply('250 OK')
+
+    def reply(self, text):
+        self.wfile.write(text.encode() + b'\r\n')
+
+
+class SMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.connections = list()
+        self.messages = list()
+
+    def drop_connections(self):
+        """Closes the server side of every open connection"""
+        for connection in self.connections:
+            connection.shutdown(socket.SHUT_RDWR)
+
+
+@pytest.fixture
+def server():
+    server = SMTPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def notifier(server, monkeypatch):
+    monkeypatch.setattr(CONST, 'NOTIFY_WINDOW', 0.2)
+    monkeypatch.setattr(CONST, 'NOTIFY_SMTP_TIMEOUT', 2)
+    notifier = AlarmNotifier(logging.getLogger('test_notifier'))
+    notifier.configure('127.0.0.1', server.server_address[1],
+                       'logicpi@localhost', '',
+                       'alarms@localhost', use_ssl=False)
+    yield notifier
+    notifier.stop(timeout=5)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_events_within_window_are_coalesced(server, notifier):
+    notifier.notify('HIGH_TEMP', 'ACTIVE', 'Tank too hot')
+    notifier.notify('HIGH_TEMP', 'CLEAR', 'Tank too hot')
+    notifier.notify('LOW_LEVEL', 'ACTIVE', 'Tank level low')
+
+    assert wait_for(lambda: server.messages)
+    time.sleep(0.5)
+    assert len(server.messages) == 1
+    message = server.messages[0]
+    assert message['Subject'] == 'LogicPi: 2 alarm events'
+    body = message.get_payload()
+    assert 'ALARM CLEAR' in body
+    assert 'Changed state 2 times' in body
+    assert 'Name: LOW_LEVEL' in body
+
+
+def test_rate_limit_holds_events(server, notifier, monkeypatch):
+    monkeypatch.setattr(CONST, 'NOTIFY_MAX_PER_HOUR', 1)
+    notifier.notify('HIGH_TEMP', 'ACTIVE', 'Tank too hot')
+    assert wait_for(lambda: len(server.messages) == 1)
+
+    notifier.notify('LOW_LEVEL', 'ACTIVE', 'Tank level low')
+    time.sleep(1)
+    assert len(server.messages) == 1
+
+    # Held events are sent once the limit allows, or at stop
+    notifier.stop(timeout=5)
+    assert len(server.messages) == 2
+    assert 'Name: LOW_LEVEL' in server.messages[1].get_payload()
+
+
+def test_reconnects_after_connection_drops(server, notifier):
+    notifier.notify('HIGH_TEMP', 'ACTIVE', 'Tank too hot')
+    assert wait_for(lambda: len(server.messages) == 1)
+    assert len(server.connections) == 1
+
+    server.drop_connections()
+    notifier.notify('HIGH_TEMP', 'CLEAR', 'Tank too hot')
+    assert wait_for(lambda: len(server.messages) == 2)
+    assert len(server.connections) == 2
+
@@ -0,0 +1,32 @@
+import queue
+
+import pytest
+
+from app.constants import CONST
+from app.program import load_programs
+
+
+SAMPLE_PROGRAM = '''
+from app.async_program import AsyncProgram
+
+
+class Sample(AsyncProgram):
+    def program_init(self):
+        self.period = 1
+'''
+
+
+@pytest.fixture
+def program_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(CONST, 'CONFIG_DIR', tmp_path)
+    package = tmp_path / 'sample_programs'
+    package.mkdir()
+    (package / '__init__.py').write_text('')
+    (package / 'sample.py').write_text(SAMPLE_PROGRAM)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return package.name
+
+
+def test_imported_base_classes_are_not_loaded(program_dir):
+    programs = load_programs(program_dir, queue.Queue())
+    assert [program.name for program in programs] == ['sample']